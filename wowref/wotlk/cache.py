@@ -0,0 +1,151 @@
+"""A process local cache of ItemTemplate rows.
+
+Popular items, such as tier set pieces and gems, are read on almost every
+request.  Their templates are kept in a least recently used cache keyed by
+(profile, entry), so a row loaded with one ITEM_TEMPLATE_PROFILES entry is
+never handed out for another that needs more columns.
+
+It is configured with the ITEM_TEMPLATE_CACHE setting:
+
+    ITEM_TEMPLATE_CACHE = {
+        'SIZE': 4096,   # The maximum number of rows, 0 disables the cache.
+        'TTL': 600,     # Seconds a row is kept for, None to keep it forever.
+    }
+"""
+from collections import OrderedDict
+import threading
+import time
+
+from django.conf import settings
+
+from .models import ItemTemplate
+
+
+class LRUCache(object):
+    """A thread safe least recently used cache whose entries expire.
+
+    Args:
+        size: The maximum number of entries.  The least recently used entry
+            is evicted to make room for a new one.
+        ttl: The number of seconds an entry is valid for, or None.
+        clock: The function returning the current time in seconds.
+
+    """
+    def __init__(self, size, ttl=None, clock=time.monotonic):
+        self.size = size
+        self.ttl = ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, default=None):
+        """The value of key, counting the lookup as a hit or a miss."""
+        with self._lock:
+            try:
+                value, expires = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+
+            if expires is not None and expires <= self.clock():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        if self.size <= 0:
+            return
+
+        expires = None if self.ttl is None else self.clock() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, keys=None):
+        """Removes keys from the cache, or every entry if keys is None."""
+        with self._lock:
+            if keys is None:
+                self._entries.clear()
+                return
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        """A dict of the size of the cache and its hit, miss and eviction counts."""
+        return {
+            'size': len(self._entries),
+            'max_size': self.size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class ItemTemplateCache(LRUCache):
+    """An LRUCache of ItemTemplate rows that loads the ones it is missing."""
+
+    def get_many(self, entries, profile='tooltip'):
+        """The templates of entries, querying the missing ones at once.
+
+        Return:
+            A dict of entry to template.  Entries without a template are left
+            out.
+
+        """
+        templates = {}
+        missing = []
+        for entry in set(int(entry) for entry in entries if entry is not None):
+            template = self.get((profile, entry))
+            if template is None:
+                missing.append(entry)
+            else:
+                templates[entry] = template
+
+        if missing:
+            loaded = ItemTemplate.objects.profile(profile).in_bulk(missing)
+            for entry, template in loaded.items():
+                self.set((profile, entry), template)
+            templates.update(loaded)
+        return templates
+
+    def get_template(self, entry, profile='tooltip'):
+        """The template of entry.
+
+        Raises:
+            ItemTemplate.DoesNotExist: If there is no such template.
+
+        """
+        try:
+            return self.get_many([entry], profile)[int(entry)]
+        except (KeyError, TypeError, ValueError):
+            raise ItemTemplate.DoesNotExist('No item template with entry %r' % (entry,))
+
+    def invalidate_entries(self, entries=None):
+        """Removes the rows of entries for every profile, or every row."""
+        if entries is None:
+            self.invalidate()
+            return
+        entries = set(int(entry) for entry in entries)
+        with self._lock:
+            for key in [key for key in self._entries if key[1] in entries]:
+                del self._entries[key]
+
+
+def _create_item_template_cache():
+    config = {'SIZE': 4096, 'TTL': 600}
+    config.update(getattr(settings, 'ITEM_TEMPLATE_CACHE', {}))
+    return ItemTemplateCache(config['SIZE'], config['TTL'])
+
+
+item_template_cache = _create_item_template_cache()
@@ -1,9 +1,10 @@
-from collections import namedtuple
 import concurrent.futures
+import hashlib
 import inspect
 import operator
 import os
-import re
+import pickle
+import threading
 
 from .lib import (
     AreaTableDBC, CharClassDBC, CharRaceDBC, CharTitlesDBC, GemPropertiesDBC,
@@ -11,12 +12,17 @@ from .lib import (
     SpellDBC, SpellCastTimesDBC, SpellDurationDBC, SpellIconDBC, SpellRadiusDBC,
     SpellItemEnchantmentDBC, SpellItemEnchantmentConditionDBC
 )
+from .descriptions import compile_description, evaluate_expression, render as render_description
+from .tables import ColumnStore, IntMultiTable, IntTable
+from .snapshots import (
+    read_snapshot, skeleton_signature, write_keyed_snapshot, write_snapshot, KeyedSnapshot,
+    StaleSnapshot
+)
 from .timers import LoadTimerWithSuccess, LoadedRecords
 
-import pickle
-
 
 dbc_path = os.path.join(os.path.dirname(inspect.getfile(inspect.currentframe())), 'files')
+snapshot_path = os.path.join(dbc_path, 'snapshots')
 __all__ = [
     'CharClass', 'CharRace', 'CharTitle', 'GemProperties', 'ItemClass',
     'ItemDisplayInfo', 'ItemSet', 'ItemSubClass', 'Spell', 'SpellDuration',
@@ -24,19 +30,142 @@ __all__ = [
 ]
 
 
-def load_dbc_data():
-    """Loads the DBC data into memory."""
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-        for cls in sorted(__all__):
-            cls = globals()[cls]
-            if issubclass(cls, _DBCDataLoadable):
-                executor.submit(cls.load_data)
+def load_dbc_data(processes=None):
+    """Loads all of the DBC data into memory.
+
+    Every table also loads itself the first time it is used, so this is only
+    needed to warm up, for example before a pre-fork server forks its workers.
+
+    Every DBC file is parsed in its own worker process.  Each worker sends its
+    data back as a single pickled buffer, which is then set on the loader
+    class in this process.  If any loader fails its exception is raised here.
+
+    Args:
+        processes: The number of worker processes, defaults to the number of
+            CPUs.  With 1 everything is loaded in this process instead.
+
+    """
+    loaders = sorted(_DBCDataLoadable.__subclasses__(), key=lambda cls: cls.__name__)
+
+    if processes == 1:
+        for cls in loaders:
+            cls.load_data()
+        return
+
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = dict(
+            (executor.submit(_read_loader_data, cls.__name__), cls) for cls in loaders
+        )
+        for future in concurrent.futures.as_completed(futures):
+            futures[future].set_data(pickle.loads(future.result()))
+
+
+def _read_loader_data(name):
+    """Reads the data of the loader called name, run in a worker process."""
+    cls = globals()[name]
+    with LoadTimerWithSuccess(cls.dbc_name, subLoad=True):
+        records, data = cls.read_data()
+        LoadedRecords(records)
+    return pickle.dumps(data, pickle.HIGHEST_PROTOCOL)
+
+
+def prerender_spell_descriptions(processes=None, chunk_size=2000):
+    """Renders the description of every spell into a keyed snapshot.
+
+    Spell.get_formatted_description looks descriptions up in the snapshot
+    and only formats the ones that are not in it.  Descriptions that still
+    hold a reference after formatting, such as $SPH, depend on who is looking
+    at them and are left out, as are those whose data is missing or whose
+    expressions can not be evaluated.  Any other error is raised.
+
+    Args:
+        processes: The number of worker processes, defaults to the number of
+            CPUs.  With 1 everything is rendered in this process instead.
+        chunk_size: The number of spells sent to a worker at once.
+
+    Returns:
+        A tuple of the number of descriptions stored, the number of spells and
+        the sorted ids of the spells whose description failed to format.
+
+    """
+    ids = list(Spell.spell_store)
+    chunks = [ids[i:i + chunk_size] for i in range(0, len(ids), chunk_size)]
+
+    if processes == 1:
+        rendered = [_render_spell_descriptions(chunk) for chunk in chunks]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+            rendered = list(executor.map(_render_spell_descriptions, chunks))
+
+    items = [item for chunk, _ in rendered for item in chunk]
+    failed = sorted(id for _, chunk_failed in rendered for id in chunk_failed)
+    write_keyed_snapshot(get_snapshot_path(Spell.description_snapshot_name),
+                         Spell.get_description_sources(), Spell.get_description_version(), items)
+    Spell.prerendered_descriptions = None
+    return len(items), len(ids), failed
+
+
+# The errors of formatting a description whose data is incomplete: a missing
+# spell, duration or radius, an effect index out of range, or an expression
+# that evaluate_expression rejects or that divides by zero.
+_DESCRIPTION_DATA_ERRORS = (KeyError, IndexError, ZeroDivisionError, SyntaxError, ValueError)
+
+
+def _render_spell_descriptions(ids):
+    """Renders the descriptions of ids as utf-8, run in a worker process.
+
+    Returns:
+        A tuple of a list of (id, description) and a list of the ids whose
+        description failed to format.
+
+    """
+    rendered = []
+    failed = []
+    for id in ids:
+        try:
+            description = Spell.format_description(id)
+        except _DESCRIPTION_DATA_ERRORS:
+            failed.append(id)
+            continue
+        if '$' not in description:
+            rendered.append((id, description.encode('utf-8')))
+    return rendered, failed
 
 
 def get_dbc_path(dbc_name):
     return os.path.join(dbc_path, '%s.dbc' % dbc_name)
 
 
+def get_snapshot_path(name):
+    return os.path.join(snapshot_path, '%s.snapshot' % name)
+
+
+_data_version = None
+
+
+def get_data_version():
+    """A short string that changes whenever the DBC data could have changed.
+
+    It is derived from the size and mtime of every DBC file and the version
+    of every loader, so it is cheap enough to compute without loading any
+    data.  It is only computed once per process, since the DBC files are
+    never replaced under a running server.
+    """
+    global _data_version
+    if _data_version is None:
+        h = hashlib.sha1()
+        for cls in sorted(_DBCDataLoadable.__subclasses__(), key=lambda cls: cls.__name__):
+            try:
+                st = os.stat(get_dbc_path(cls.dbc_name))
+                source = (st.st_size, st.st_mtime_ns)
+            except OSError:
+                source = None
+            h.update(repr((cls.__name__, cls.loader_version, source)).encode('utf-8'))
+        h.update(repr(Spell.description_version).encode('utf-8'))
+        _data_version = h.hexdigest()[:12]
+    return _data_version
+
+
 def date_diff(secs, n=True, short=False):
     """
     Converts seconds to x hour(s) x minute(s) (and) x second(s)
@@ -90,36 +219,136 @@ def date_diff(secs, n=True, short=False):
     return ' '.join(time_string)
 
 
-class _DBCDataLoadable(object):
+class _LazyDBCData(type):
+    """Metaclass that loads a DBC table the first time its data is accessed.
+
+    Class attribute lookups only fall through to __getattr__ when the
+    attribute does not exist, which is the case for the data attributes set
+    by build_data until the table is loaded.  Only the names listed in
+    data_names load the table, any other missing attribute is an
+    AttributeError straight away.
+    """
+    def __init__(cls, name, bases, namespace):
+        super(_LazyDBCData, cls).__init__(name, bases, namespace)
+        cls._load_lock = threading.Lock()
+        cls._loaded = False
+
+    def __getattr__(cls, name):
+        if cls._loaded or name not in type.__getattribute__(cls, 'data_names'):
+            raise AttributeError(name)
+        cls.ensure_loaded()
+        return type.__getattribute__(cls, name)
+
+
+class _DBCDataLoadable(object, metaclass=_LazyDBCData):
     """Base class for DBC data storage subclasses.
 
     DBC data storage should implement this class, it prevents it from being,
-    initialized, and ensures it has a loadData class method.
+    initialized, and ensures it has a build_data class method.
+
+    Subclasses name the DBC file they are built from with dbc_name and
+    dbc_class.  load_data reads the data from a snapshot when there is a valid
+    one, otherwise it parses the DBC file with build_data and writes a new
+    snapshot.  It is called automatically the first time one of the data
+    attributes is accessed.
 
     """
 
+    dbc_name = None
+    dbc_class = None
+
+    # The names of the attributes build_data sets, accessing one of them
+    # loads the table.
+    data_names = ()
+
+    # Bump this whenever build_data changes the data it builds, so that the
+    # existing snapshots are rebuilt.
+    loader_version = 1
+
     def __init__(self):
         raise RuntimeError("This class should not be __init__'ed.")
 
     @classmethod
     def load_data(cls):
         """Load Data into this class structure..."""
+        with LoadTimerWithSuccess(cls.dbc_name, subLoad=True):
+            records, data = cls.read_data()
+            LoadedRecords(records)
+        cls.set_data(data)
+
+    @classmethod
+    def ensure_loaded(cls):
+        """Loads the data unless it already is, safe to call from any thread."""
+        if cls._loaded:
+            return
+        with cls._load_lock:
+            if not cls._loaded:
+                cls.load_data()
+
+    @classmethod
+    def set_data(cls, data):
+        """Sets the data returned by build_data on the class."""
+        unknown = set(data) - set(cls.data_names)
+        if unknown:
+            raise ValueError('%s.build_data returned %s, which are not in data_names' %
+                             (cls.__name__, ', '.join(sorted(unknown))))
+        for name, value in data.items():
+            setattr(cls, name, value)
+        cls._loaded = True
+
+    @classmethod
+    def read_data(cls):
+        """Reads the data, from the snapshot when it is still valid.
+
+        Returns:
+            A tuple of the number of records in the DBC file and the dict
+            that build_data returned.
+
+        """
+        dbc = cls.dbc_class(get_dbc_path(cls.dbc_name))
+        path = get_snapshot_path(cls.__name__)
+        version = (skeleton_signature(dbc), cls.loader_version)
+        try:
+            return read_snapshot(path, dbc.filename, version)
+        except StaleSnapshot:
+            pass
+
+        dbc.open()
+        result = (dbc.records, cls.build_data(dbc))
+        try:
+            write_snapshot(path, dbc.filename, version, result)
+        except (IOError, OSError):
+            # The snapshot is only an optimization, don't fail on a read only
+            # file system.
+            pass
+        return result
+
+    @classmethod
+    def build_data(cls, dbc):
+        """Builds the data of this class from the DBC file.
+
+        Returns:
+            A dict of the class attributes to set.  It must be picklable, so
+            it can not hold DBC records or DBCStrings.
+
+        """
         raise NotImplementedError()
 
 
 class CharTitle(_DBCDataLoadable):
-    @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('CharTitles', subLoad=True):
-            dbc = CharTitlesDBC(get_dbc_path("CharTitles"))
-            cls.title_data = [
-                (f.Id, f.Id // 32, 1 << (f.Id % 32), [f.TitleMale[0], f.TitleFemale[0]], f.SelectionIndex) for f in dbc
-            ]
-            cls.title_data_dict = dict(
-                (f[4], f) for f in cls.title_data
-            )
+    dbc_name = 'CharTitles'
+    dbc_class = CharTitlesDBC
+    data_names = ('title_data', 'title_data_dict')
 
-            LoadedRecords(len(cls.title_data))
+    @classmethod
+    def build_data(cls, dbc):
+        title_data = [
+            (f.Id, f.Id // 32, 1 << (f.Id % 32), [f.TitleMale.text, f.TitleFemale.text], f.SelectionIndex) for f in dbc
+        ]
+        return {
+            'title_data': title_data,
+            'title_data_dict': dict((f[4], f) for f in title_data)
+        }
 
     @classmethod
     def get_title(cls, title_id):
@@ -158,14 +387,16 @@ class CharTitle(_DBCDataLoadable):
 
 
 class CharClass(_DBCDataLoadable):
+    dbc_name = 'ChrClasses'
+    dbc_class = CharClassDBC
+    data_names = ('classes_data_dict',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('ChrClasses', subLoad=True):
-            dbc = CharClassDBC(get_dbc_path("ChrClasses"))
-            cls.classes_data_dict = dict(
-                (f.ClassID, f.name[0]) for f in dbc
-            )
-            LoadedRecords(len(cls.classes_data_dict))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'classes_data_dict': dict(zip(columns['ClassID'], columns.strings('name')))
+        }
 
     @classmethod
     def get_name(cls, class_id):
@@ -173,14 +404,16 @@ class CharClass(_DBCDataLoadable):
 
 
 class CharRace(_DBCDataLoadable):
+    dbc_name = 'ChrRaces'
+    dbc_class = CharRaceDBC
+    data_names = ('races_data_dict',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('ChrRaces', subLoad=True):
-            dbc = CharRaceDBC(get_dbc_path('ChrRaces'))
-            cls.races_data_dict = dict(
-                (f.RaceID, f.name[0]) for f in dbc
-            )
-            LoadedRecords(len(cls.races_data_dict))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'races_data_dict': dict(zip(columns['RaceID'], columns.strings('name')))
+        }
 
     @classmethod
     def get_name(cls, race_id):
@@ -188,14 +421,23 @@ class CharRace(_DBCDataLoadable):
 
 
 class GemProperties(_DBCDataLoadable):
+    dbc_name = 'GemProperties'
+    dbc_class = GemPropertiesDBC
+    data_names = ('gem_properties', 'enchant_gem_properties')
+    loader_version = 3
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('GemProperties', subLoad=True):
-            dbc = GemPropertiesDBC(get_dbc_path('GemProperties'))
-            cls.gem_properties = dict(
-                (f.ID, (f.Type, f.SpellItemEnchantment)) for f in dbc
-            )
-            LoadedRecords(len(cls.gem_properties))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'gem_properties': IntTable(columns['ID'], columns['Type'], columns['SpellItemEnchantment']),
+            'enchant_gem_properties': IntMultiTable(zip(columns['SpellItemEnchantment'], columns['ID'])),
+        }
+
+    @classmethod
+    def get_gem_properties_ids(cls, enchant_id):
+        """The ids of the gem properties that grant the enchant enchant_id."""
+        return cls.enchant_gem_properties.get(enchant_id)
 
     @classmethod
     def get_color_mask(cls, gem_id, default=None):
@@ -221,14 +463,17 @@ class GemProperties(_DBCDataLoadable):
 
 
 class ItemData(_DBCDataLoadable):
+    dbc_name = 'Item'
+    dbc_class = ItemDBC
+    data_names = ('item',)
+    loader_version = 2
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('Item', subLoad=True):
-            dbc = ItemDBC(get_dbc_path('Item'))
-            cls.item = dict(
-                (f.ID, f.InventoryType) for f in dbc
-            )
-            LoadedRecords(len(cls.item))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'item': IntTable(columns['ID'], columns['InventoryType'])
+        }
 
     @classmethod
     def get_inventory_type(cls, item_id):
@@ -236,14 +481,16 @@ class ItemData(_DBCDataLoadable):
 
 
 class ItemClass(_DBCDataLoadable):
+    dbc_name = 'ItemClass'
+    dbc_class = ItemClassDBC
+    data_names = ('item_class',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('ItemClass', subLoad=True):
-            dbc = ItemClassDBC(get_dbc_path('ItemClass'))
-            cls.item_class = dict(
-                (f.ID, f.Name[0]) for f in dbc
-            )
-            LoadedRecords(len(cls.item_class))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'item_class': dict(zip(columns['ID'], columns.strings('Name')))
+        }
 
     @classmethod
     def get_display_name(cls, class_id):
@@ -251,14 +498,16 @@ class ItemClass(_DBCDataLoadable):
 
 
 class ItemDisplayInfo(_DBCDataLoadable):
+    dbc_name = 'ItemDisplayInfo'
+    dbc_class = ItemDisplayInfoDBC
+    data_names = ('item_display_data_dict',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('ItemDisplayInfo', subLoad=True):
-            dbc = ItemDisplayInfoDBC(get_dbc_path('ItemDisplayInfo'))
-            cls.item_display_data_dict = dict(
-                (f.ID, f.InvType) for f in dbc
-            )
-            LoadedRecords(len(cls.item_display_data_dict))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'item_display_data_dict': dict(zip(columns['ID'], columns.strings('InvType')))
+        }
 
     @classmethod
     def get_icon_name(cls, display_id):
@@ -267,140 +516,145 @@ class ItemDisplayInfo(_DBCDataLoadable):
 
 
 class ItemSet(_DBCDataLoadable):
-    @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('ItemSet', subLoad=True):
-            dbc = ItemSetDBC(get_dbc_path('ItemSet'))
-            cls.item_set = {}
-            for f in dbc:
-                f.data['display_name'] = f.DisplayName[0]
-                f.data['items'] = [i for i in f.Items if i]
-                f.data['threshold_pairs'] = sorted(i for i in zip(f.Threshold, f.SpellID) if i[0] and i[1])
-                cls.item_set[f.ID] = f.data
-            LoadedRecords(len(cls.item_set))
+    dbc_name = 'ItemSet'
+    dbc_class = ItemSetDBC
+    data_names = ('item_set', 'item_set_ids')
+    loader_version = 4
+
+    @classmethod
+    def build_data(cls, dbc):
+        item_sets = {}
+        for f in dbc:
+            item_set = f._asdict()
+            del item_set['DisplayName']
+            item_set['display_name'] = f.DisplayName.text
+            item_set['items'] = [i for i in f.Items if i]
+            item_set['threshold_pairs'] = sorted(i for i in zip(f.Threshold, f.SpellID) if i[0] and i[1])
+            item_sets[f.ID] = item_set
+
+        return {
+            'item_set': item_sets,
+            'item_set_ids': IntMultiTable(
+                (item_id, set_id) for set_id in sorted(item_sets) for item_id in item_sets[set_id]['items']
+            )
+        }
 
     @classmethod
     def get_item_set(cls, id, default=None):
         return cls.item_set.get(id, default)
 
+    @classmethod
+    def get_item_set_ids(cls, item_id):
+        """The ids of the item sets that list item_id as one of their pieces, in order."""
+        return cls.item_set_ids.get(item_id)
+
 
 class ItemSubClass(_DBCDataLoadable):
+    dbc_name = 'ItemSubClass'
+    dbc_class = ItemSubClassDBC
+    data_names = ('item_sub_class_dict',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('ItemSubClass', subLoad=True):
-            dbc = ItemSubClassDBC(get_dbc_path('ItemSubClass'))
-            cls.item_sub_class_dict = {}
-            for f in dbc:
-                cls.item_sub_class_dict[f.ClassID, f.SubClassID] = f.DisplayName[0]
-            LoadedRecords(len(cls.item_sub_class_dict))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'item_sub_class_dict': dict(
+                zip(zip(columns['ClassID'], columns['SubClassID']), columns.strings('DisplayName'))
+            )
+        }
 
     @classmethod
     def get_display_name(cls, class_id, subclass_id, default=None):
         return cls.item_sub_class_dict.get((class_id, subclass_id), default)
 
 
-_Spell = namedtuple("_Spell", "SpellName SpellIconID ToolTip Description EffectBasePoints DurationIndex "
-                              "MaxAffectedTargets RangeIndex ProcChance ProcCharges StackAmount "
-                              "EffectAmplitude EffectRadiusIndex CastingTimeIndex "
-                              "EffectMiscValue EffectMiscValueB EffectChainTarget EffectMultipleValue "
-                              "EffectBonusMultiplier Effect EffectApplyAuraName EffectDieSides "
-                              "Reagent ReagentCount Category Rank")
-
-
 class Spell(_DBCDataLoadable):
-    @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('Spell', subLoad=True):
-            _cache_file = os.path.join(dbc_path, 'Spell.dbc.cache')
-            if os.path.exists(_cache_file):
-                cls.spell_data_dict = pickle.load(open(_cache_file, 'rb'))
+    dbc_name = 'Spell'
+    dbc_class = SpellDBC
+    data_names = ('spell_store',)
+    loader_version = 2
+
+    _scalar_columns = (
+        'SpellIconID', 'DurationIndex', 'MaxAffectedTargets', 'RangeIndex', 'ProcChance',
+        'ProcCharges', 'StackAmount', 'CastingTimeIndex', 'Category'
+    )
+    _array_columns = (
+        'EffectBasePoints', 'EffectAmplitude', 'EffectRadiusIndex', 'EffectMiscValue',
+        'EffectMiscValueB', 'EffectChainTarget', 'EffectMultipleValue', 'EffectBonusMultiplier',
+        'Effect', 'EffectApplyAuraName', 'EffectDieSides', 'Reagent', 'ReagentCount'
+    )
+    _string_columns = ('SpellName', 'ToolTip', 'Description', 'Rank')
 
-            else:
-                cls.spell_data_dict = {}
-                dbc = SpellDBC(get_dbc_path("Spell"))
-
-                for f in dbc:
-                    cls.spell_data_dict[f.ID] = _Spell(
-                        f.SpellName[0], f.SpellIconID,
-                        f.ToolTip[0], f.Description[0],
-                        f.EffectBasePoints, f.DurationIndex,
-                        f.MaxAffectedTargets, f.RangeIndex,
-                        f.ProcChance, f.ProcCharges,
-                        f.StackAmount, f.EffectAmplitude,
-                        f.EffectRadiusIndex, f.CastingTimeIndex,
-                        f.EffectMiscValue, f.EffectMiscValueB,
-                        f.EffectChainTarget, f.EffectMultipleValue,
-                        f.EffectBonusMultiplier, f.Effect,
-                        f.EffectApplyAuraName, f.EffectDieSides,
-                        f.Reagent, f.ReagentCount, f.Category, f.Rank
-                    )
-
-                pickle.dump(cls.spell_data_dict, open(_cache_file, 'wb'), -1)
-
-            LoadedRecords(len(cls.spell_data_dict))
+    @classmethod
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        numeric = dict((name, [columns[name]]) for name in cls._scalar_columns)
+        numeric.update((name, columns[name]) for name in cls._array_columns)
+        strings = dict((name, columns.strings(name)) for name in cls._string_columns)
+        return {'spell_store': ColumnStore(columns['ID'], numeric, strings)}
 
     @classmethod
     def get_name(cls, id):
-        return cls.spell_data_dict[id].SpellName
+        return cls.spell_store.get(id, 'SpellName')
 
     @classmethod
     def get_category(cls, id):
-        return cls.spell_data_dict[id].Category
+        return cls.spell_store.get(id, 'Category')
 
     @classmethod
     def get_icon_id(cls, id):
-        return cls.spell_data_dict[id].SpellIconID
+        return cls.spell_store.get(id, 'SpellIconID')
 
     @classmethod
     def get_tooltip(cls, id):
-        return cls.spell_data_dict[id].ToolTip
+        return cls.spell_store.get(id, 'ToolTip')
 
     @classmethod
     def get_description(cls, id):
-        return cls.spell_data_dict[id].Description
+        return cls.spell_store.get(id, 'Description')
 
     @classmethod
     def get_base_points(cls, id):
-        return cls.spell_data_dict[id].EffectBasePoints
+        return cls.spell_store.get(id, 'EffectBasePoints')
 
     @classmethod
     def get_duration(cls, id):
-        duration_id = cls.spell_data_dict[id].DurationIndex
+        duration_id = cls.spell_store.get(id, 'DurationIndex')
         if not duration_id:
             return 0
         return SpellDuration.get_base_duration(duration_id)
 
     @classmethod
     def get_max_targets(cls, id):
-        return cls.spell_data_dict[id].MaxAffectedTargets
+        return cls.spell_store.get(id, 'MaxAffectedTargets')
 
     @classmethod
     def get_range_index(cls, id):
-        return cls.spell_data_dict[id].RangeIndex
+        return cls.spell_store.get(id, 'RangeIndex')
 
     @classmethod
     def get_effect_amplitude(cls, id):
-        return cls.spell_data_dict[id].EffectAmplitude
+        return cls.spell_store.get(id, 'EffectAmplitude')
 
     @classmethod
     def get_max_effect_radius(cls, id):
-        return [SpellRadius.get_max_radius(i) if i else 0 for i in cls.spell_data_dict[id].EffectRadiusIndex]
+        return [SpellRadius.get_max_radius(i) if i else 0 for i in cls.spell_store.get(id, 'EffectRadiusIndex')]
 
     @classmethod
     def get_proc_chance(cls, id):
-        return cls.spell_data_dict[id].ProcChance
+        return cls.spell_store.get(id, 'ProcChance')
 
     @classmethod
     def get_proc_charges(cls, id):
-        return cls.spell_data_dict[id].ProcCharges
+        return cls.spell_store.get(id, 'ProcCharges')
 
     @classmethod
     def get_stack_amount(cls, id):
-        return cls.spell_data_dict[id].StackAmount
+        return cls.spell_store.get(id, 'StackAmount')
 
     @classmethod
     def get_casting_time_index(cls, id):
-        return cls.spell_data_dict[id].CastingTimeIndex
+        return cls.spell_store.get(id, 'CastingTimeIndex')
 
     @classmethod
     def get_casting_times(cls, id):
@@ -408,39 +662,39 @@ class Spell(_DBCDataLoadable):
 
     @classmethod
     def get_misc_value(cls, id):
-        return cls.spell_data_dict[id].EffectMiscValue
+        return cls.spell_store.get(id, 'EffectMiscValue')
 
     @classmethod
     def get_misc_value_b(cls, id):
-        return cls.spell_data_dict[id].EffectMiscValueB
+        return cls.spell_store.get(id, 'EffectMiscValueB')
 
     @classmethod
     def get_chained_targets(cls, id):
-        return cls.spell_data_dict[id].EffectChainTarget
+        return cls.spell_store.get(id, 'EffectChainTarget')
 
     @classmethod
     def get_effect(cls, id):
-        return cls.spell_data_dict[id].Effect
+        return cls.spell_store.get(id, 'Effect')
 
     @classmethod
     def get_effect_apply_aura_name(cls, id):
-        return cls.spell_data_dict[id].EffectApplyAuraName
+        return cls.spell_store.get(id, 'EffectApplyAuraName')
 
     @classmethod
     def get_die_sides(cls, id):
-        return cls.spell_data_dict[id].EffectDieSides
+        return cls.spell_store.get(id, 'EffectDieSides')
 
     @classmethod
     def get_reagents(cls, id):
-        return cls.spell_data_dict[id].Reagent
+        return cls.spell_store.get(id, 'Reagent')
 
     @classmethod
     def get_reagents_count(cls, id):
-        return cls.spell_data_dict[id].ReagentCount
+        return cls.spell_store.get(id, 'ReagentCount')
 
     @classmethod
     def get_rank(cls, spell_id):
-        return cls.spell_data_dict[spell_id].Rank[0]
+        return cls.spell_store.get(spell_id, 'Rank')
 
     _operators = {
         "*": operator.mul,
@@ -450,138 +704,126 @@ class Spell(_DBCDataLoadable):
     }
 
     _indexed_values = 'sotmMSax'
-    _format_re = re.compile(r"""
-            \$              # Start with a dollar sign
-            (?:             # our first match group for formula ( /1000;
-               (?P<f_operator>[/\+\-\*])   # Operator
-               (?P<f_rhs>\d+)            # Right hand side
-               ;
-            )?
-            (?P<ref_id>\d+)?
-            (?P<type>(SPH|MW|mw)|[hinuSmMsdDaotx])
-            (?P<index>\d+)?
-            (?:\.
-                (?P<round>\d+)
-            )?
-        """, re.VERBOSE)
-
-    _condition_re = re.compile(r"""
-            \$\?
-            \(? # Conditional match type
-                (?P<type>s)     # Search type s=spell, ???
-                (?P<ref_id>\d+)
-            \)? # Id to match
-            \[(?P<true>[^\]]*)\]   # True pred
-            \[(?P<false>[^\]]*)\]  # False pred
-        """, re.VERBOSE)
-
-    _pluralizer_re = re.compile(r"""
-        (?P<num>\d+)
-        \s\$l                   # matches things like 3 $lsec:secs;
-        (?P<singular>[^:]*):
-        (?P<plural>[^;]*);
-    """, re.VERBOSE)
-
-    _evaluate_re = re.compile(r"""
-        \$\{
-            (?P<expression>[^\}]+)
-        \}
-        (?:\.
-            (?P<round>\d+)
-        )?
-    """, re.VERBOSE)
+
+    # Bump when the output of format_description changes, so the snapshot
+    # written by prerender_spell_descriptions is no longer used.
+    description_version = 1
+    description_snapshot_name = 'SpellDescriptions'
+    prerendered_descriptions = None
 
     @classmethod
-    def get_formatted_description(cls, id):
-        """Format the description, pulling in data from all over."""
+    def get_description_sources(cls):
+        """The DBC files the formatted descriptions are built from."""
+        return [get_dbc_path(name) for name in ('Spell', 'SpellDuration', 'SpellRadius')]
+
+    @classmethod
+    def get_description_version(cls):
+        return (skeleton_signature(cls.dbc_class(get_dbc_path(cls.dbc_name))),
+                cls.loader_version, cls.description_version)
 
-        # Description Variables
-        description = cls.get_description(id)
-        description = description.replace("$Ghe:she;", 'he or she')
-        description = description.replace("$<mult>", "1")
-        description = description.replace("$<duration>", str(Spell.get_duration(id)))
-        description = description.replace("$<threat>", "10")
+    @classmethod
+    def get_prerendered_descriptions(cls):
+        """The snapshot of prerender_spell_descriptions, or {} if it is stale."""
+        if cls.prerendered_descriptions is None:
+            try:
+                cls.prerendered_descriptions = KeyedSnapshot(
+                    get_snapshot_path(cls.description_snapshot_name),
+                    cls.get_description_sources(), cls.get_description_version())
+            except StaleSnapshot:
+                cls.prerendered_descriptions = {}
+        return cls.prerendered_descriptions
 
-        def sub_points(m):
-            groupdict = m.groupdict()
-            dont_round = False
-            spell_id = int(groupdict['ref_id'] or id)
+    @classmethod
+    def get_formatted_description(cls, id):
+        """Format the description, pulling in data from all over.
 
-            type = groupdict['type']
-            if type in ('mw', 'MW', 'SPH'):
-                return m.group(0)
+        Descriptions that were prerendered are only looked up.
+        """
+        description = cls.get_prerendered_descriptions().get(id)
+        if description is not None:
+            return description.decode('utf-8')
+        return cls.format_description(id)
 
-            results = []
+    @classmethod
+    def format_description(cls, id):
+        """Formats the description of spell id, without the prerendered ones.
 
-            result = cls._getters[type](spell_id)
-            if type in cls._indexed_values:
-                index = int(groupdict['index'] or 1) - 1
-                die_sides = Spell.get_die_sides(spell_id)[index] - 1
+        The description is compiled once into a token program, rendering it
+        only looks up the data its references point at.
+        """
+        program = compile_description(cls.get_description(id))
+        return render_description(program, id, cls._format_reference, cls.get_duration, cls._evaluate)
 
-                result = result[index] + (1 if type in 'MmoSsx' else 0)
-                if type not in 'mM':
-                    result = abs(result)
+    @classmethod
+    def _format_reference(cls, id, reference):
+        """The text of a reference like $s1 in the description of spell id."""
+        dont_round = False
+        spell_id = id if reference.ref_id is None else reference.ref_id
 
-                if type == 'o':
-                    result *= Spell.get_duration(spell_id) / Spell.get_effect_amplitude(spell_id)[index]
+        type = reference.type
+        if type in ('mw', 'MW', 'SPH'):
+            return reference.text
 
-                results.append(result)
+        results = []
 
-                if die_sides and type in 'SsMmox':
-                    results.append(result + die_sides)
+        result = cls._getters[type](spell_id)
+        if type in cls._indexed_values:
+            index = reference.index
+            die_sides = Spell.get_die_sides(spell_id)[index] - 1
 
-            else:
-                results.append(result)
-
-            results_2 = []
-            for result in results:
-                operator = groupdict['f_operator']
-                if operator:
-                    rhs = float(groupdict['f_rhs'])
-                    lhs = result
-                    result = cls._operators[operator](lhs, rhs)
-                    if operator == '/' and lhs % rhs != 0:
-                        dont_round = True
-
-                round_digits = groupdict['round']
-                if round_digits:
-                    results_2.append(("%%.%if" % int(round_digits)) % float(result))
-                elif isinstance(result, (int, float)):
-                    if dont_round:
-                        results_2.append("%s" % result)
-                    else:
-                        results_2.append("%i" % result)
-                else:
-                    results_2.append(str(result))
+            result = result[index] + (1 if type in 'MmoSsx' else 0)
+            if type not in 'mM':
+                result = abs(result)
 
-            return " to ".join(results_2)
+            if type == 'o':
+                result *= Spell.get_duration(spell_id) / Spell.get_effect_amplitude(spell_id)[index]
 
-        def do_eval(m):
-            code = m.group('expression')
-            if '$' in code:
-                return '[%s]' % code
+            results.append(result)
 
-            result = eval(code, {}, {})
-            round_digits = m.group('round')
-            if round_digits:
-                return ("%%.%if" % int(round_digits)) % result
+            if die_sides and type in 'SsMmox':
+                results.append(result + die_sides)
+
+        else:
+            results.append(result)
+
+        results_2 = []
+        for result in results:
+            operator = reference.operator
+            if operator:
+                rhs = reference.rhs
+                lhs = result
+                result = cls._operators[operator](lhs, rhs)
+                if operator == '/' and lhs % rhs != 0:
+                    dont_round = True
+
+            round_digits = reference.round
+            if round_digits is not None:
+                results_2.append(("%%.%if" % round_digits) % float(result))
+            elif isinstance(result, (int, float)):
+                if dont_round:
+                    results_2.append("%s" % result)
+                else:
+                    results_2.append("%i" % result)
             else:
-                return "%i" % result
+                results_2.append(str(result))
 
-        def do_pluralize(m):
-            num = int(m.group('num'))
-            return "%s %s" % (m.group('num'), m.group('singular') if num == 1 else m.group('plural'))
+        return " to ".join(results_2)
 
-        description = cls._format_re.sub(sub_points, description)
-        description = cls._condition_re.sub(lambda m: m.group('false'), description)
-        description = cls._evaluate_re.sub(do_eval, description)
-        description = cls._pluralizer_re.sub(do_pluralize, description)
+    @staticmethod
+    def _evaluate(code, round_digits):
+        """The text of an expression like ${$m1/1000}.1."""
+        if '$' in code:
+            return '[%s]' % code
 
-        return description
+        result = evaluate_expression(code)
+        if round_digits is not None:
+            return ("%%.%if" % round_digits) % result
+        else:
+            return "%i" % result
 
     @classmethod
     def __iter__(cls):
-        return iter(cls.spell_data_dict)
+        return iter(cls.spell_store)
 
 # This has to be down here, or else it doesn't know what "Spell" is.
 Spell._getters = {
@@ -603,15 +845,17 @@ Spell._getters = {
 
 
 class SpellCastTimes(_DBCDataLoadable):
-    @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('SpellCastTimes', subLoad=True):
-            cls.cast_time_dict = {}
-            dbc = SpellCastTimesDBC(get_dbc_path("SpellCastTimes"))
-            for f in dbc:
-                cls.cast_time_dict[f.ID] = f.CastTime
+    dbc_name = 'SpellCastTimes'
+    dbc_class = SpellCastTimesDBC
+    data_names = ('cast_time_dict',)
+    loader_version = 2
 
-            LoadedRecords(len(cls.cast_time_dict))
+    @classmethod
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'cast_time_dict': IntTable(columns['ID'], columns['CastTime'])
+        }
 
     @classmethod
     def get_cast_time(cls, id):
@@ -619,15 +863,17 @@ class SpellCastTimes(_DBCDataLoadable):
 
 
 class SpellDuration(_DBCDataLoadable):
-    @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('SpellDuration', subLoad=True):
-            dbc = SpellDurationDBC(get_dbc_path("SpellDuration"))
-            cls.duration_data_dict = dict(
-                (f.ID, f.BaseDuration) for f in dbc
-            )
+    dbc_name = 'SpellDuration'
+    dbc_class = SpellDurationDBC
+    data_names = ('duration_data_dict',)
+    loader_version = 2
 
-            LoadedRecords(len(cls.duration_data_dict))
+    @classmethod
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'duration_data_dict': IntTable(columns['ID'], columns['BaseDuration'])
+        }
 
     @classmethod
     def get_base_duration(self, id):
@@ -635,13 +881,17 @@ class SpellDuration(_DBCDataLoadable):
 
 
 class SpellRadius(_DBCDataLoadable):
-    @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('SpellRadius', subLoad=True):
-            dbc = SpellRadiusDBC(get_dbc_path("SpellRadius"))
-            cls.radius_data_dict = dict((f.ID, f.RadiusMax) for f in dbc)
+    dbc_name = 'SpellRadius'
+    dbc_class = SpellRadiusDBC
+    data_names = ('radius_data_dict',)
+    loader_version = 2
 
-            LoadedRecords(len(cls.radius_data_dict))
+    @classmethod
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'radius_data_dict': IntTable(columns['ID'], columns['RadiusMax'])
+        }
 
     @classmethod
     def get_max_radius(cls, id):
@@ -649,14 +899,16 @@ class SpellRadius(_DBCDataLoadable):
 
 
 class SpellIcon(_DBCDataLoadable):
+    dbc_name = 'SpellIcon'
+    dbc_class = SpellIconDBC
+    data_names = ('spell_icon_data_dict',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('SpellIcon', subLoad=True):
-            dbc = SpellIconDBC(get_dbc_path('SpellIcon'))
-            cls.spell_icon_data_dict = dict(
-                (f.ID, f.Icon) for f in dbc
-            )
-            LoadedRecords(len(cls.spell_icon_data_dict))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'spell_icon_data_dict': dict(zip(columns['ID'], columns.strings('Icon')))
+        }
 
     @classmethod
     def get_icon(cls, icon_id):
@@ -664,14 +916,19 @@ class SpellIcon(_DBCDataLoadable):
 
 
 class SpellItemEnchantment(_DBCDataLoadable):
+    dbc_name = 'SpellItemEnchantment'
+    dbc_class = SpellItemEnchantmentDBC
+    data_names = ('spell_item_enchantment',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('SpellItemEnchantment', subLoad=True):
-            dbc = SpellItemEnchantmentDBC(get_dbc_path('SpellItemEnchantment'))
-            cls.spell_item_enchantment = {}
-            for f in dbc:
-                cls.spell_item_enchantment[f.ID] = (f.DisplayName[0], f.GemID, f.EnchantmentCondition)
-            LoadedRecords(len(cls.spell_item_enchantment))
+    def build_data(cls, dbc):
+        columns = dbc.read_columns()
+        return {
+            'spell_item_enchantment': dict(
+                zip(columns['ID'], zip(columns.strings('DisplayName'),
+                                       columns['GemID'], columns['EnchantmentCondition']))
+            )
+        }
 
     @classmethod
     def get_display_name(cls, id, default=None):
@@ -696,14 +953,15 @@ class SpellItemEnchantment(_DBCDataLoadable):
 
 
 class SpellItemEnchantmentCondition(_DBCDataLoadable):
+    dbc_name = 'SpellItemEnchantmentCondition'
+    dbc_class = SpellItemEnchantmentConditionDBC
+    data_names = ('spell_item_enchantment_condition',)
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('SpellItemEnchantmentCondition', subLoad=True):
-            dbc = SpellItemEnchantmentConditionDBC(get_dbc_path('SpellItemEnchantmentCondition'))
-            cls.spell_item_enchantment_condition = dict(
-                (f.ID, f) for f in dbc
-            )
-            LoadedRecords(len(cls.spell_item_enchantment_condition))
+    def build_data(cls, dbc):
+        return {
+            'spell_item_enchantment_condition': dict((f.ID, f._asdict()) for f in dbc)
+        }
 
     @classmethod
     def get_conditions(cls, id, default=None):
@@ -711,21 +969,23 @@ class SpellItemEnchantmentCondition(_DBCDataLoadable):
 
 
 class Zone(_DBCDataLoadable):
+    dbc_name = 'AreaTable'
+    dbc_class = AreaTableDBC
+    data_names = ('zone_data', 'zone_data_dict')
+
     @classmethod
-    def load_data(cls):
-        with LoadTimerWithSuccess('Zone', subLoad=True):
-            dbc = AreaTableDBC(get_dbc_path("AreaTable"))
-            cls.zone_data = [
-                (f.Id, f.Map, f.Name, f.AreaTable) for f in dbc
-            ]
-            cls.zone_data_dict = dict(
-                (f[0], f) for f in cls.zone_data
-            )
-            LoadedRecords(len(cls.zone_data))
+    def build_data(cls, dbc):
+        zone_data = [
+            (f.Id, f.Map, f.Name.text, f.AreaTable) for f in dbc
+        ]
+        return {
+            'zone_data': zone_data,
+            'zone_data_dict': dict((f[0], f) for f in zone_data)
+        }
 
     @classmethod
     def get_name(cls, zone_id):
-        return cls.zone_data_dict[zone_id][2][0]
+        return cls.zone_data_dict[zone_id][2]
 
     @classmethod
     def get_full_name(cls, zone_id):
@@ -0,0 +1,419 @@
+"""Benchmarks of parsing the DBC files and building the loader data.
+
+Three kinds of benchmarks are run, each in its own worker process so their
+memory use does not add up:
+
+    parse       DBCFile.read_columns of a DBC file.
+    load        build_data of a _DBCDataLoadable from its DBC file, what
+                load_data does when there is no snapshot.
+    snapshot    read_snapshot of the data that load built, what load_data
+                does on every later start.
+
+They run against the files in wotlk/dbc/files, and parse and load also run
+against synthetic files with many more records, generated from the skeleton
+of each DBCFile.
+
+For each benchmark the best time of a few runs is reported together with the
+records and megabytes per second, the peak resident set size of the worker
+and the peak and retained memory allocated by Python as seen by tracemalloc.
+The results are written as JSON, and a previous run can be compared against
+to find regressions:
+
+    python -m wotlk.dbc.benchmarks --output bench_output.txt
+    python -m wotlk.dbc.benchmarks --compare bench_output.txt
+"""
+import argparse
+import concurrent.futures
+import datetime
+import gc
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+from . import _DBCDataLoadable, dbc_path, get_dbc_path
+from .lib import Array, DBCFile, Byte, Float, Int64, Localization, PadByte, String, UInt64
+from .snapshots import read_snapshot, write_snapshot
+
+# Bump when the benchmarks or the layout of their results change, so results
+# of different versions are not compared.
+BENCHMARK_VERSION = 1
+
+# Synthetic files are built from this many distinct rows, repeated with a
+# new ID each, so generating a large file stays fast.
+_SYNTHETIC_TEMPLATE_ROWS = 64
+
+_words = (
+    'Arcane', 'Blade', 'Cowl', 'Dragon', 'Ember', 'Frost', 'Gladiator', 'Hateful', 'Iron',
+    'Jade', 'Kings', 'Lord', 'Mana', 'Night', 'of', 'the', 'Rune', 'Silk', 'Titan', 'Wrath',
+)
+
+
+def iter_dbc_classes():
+    """Every DBCFile subclass with a skeleton, by name.
+
+    A class defined twice in a module is only listed once, as the one the
+    module exports.
+    """
+    classes = {}
+    pending = list(DBCFile.__subclasses__())
+    while pending:
+        cls = pending.pop()
+        pending.extend(cls.__subclasses__())
+        if getattr(cls, 'skeleton', None):
+            classes[cls.__name__] = getattr(sys.modules[cls.__module__], cls.__name__, cls)
+    return [classes[name] for name in sorted(classes)]
+
+
+def iter_loaders():
+    """Every _DBCDataLoadable subclass, by name."""
+    return sorted(_DBCDataLoadable.__subclasses__(), key=lambda cls: cls.__name__)
+
+
+def get_shipped_files():
+    """A dict of DBCFile subclass to the path of its file in wotlk/dbc/files.
+
+    The loaders name the file of their DBCFile class, the other classes are
+    looked up by their name without the DBC suffix.
+    """
+    names = dict((loader.dbc_class, loader.dbc_name) for loader in iter_loaders())
+    files = {}
+    for cls in iter_dbc_classes():
+        path = get_dbc_path(names.get(cls, cls.__name__[:-len('DBC')]))
+        if os.path.exists(path):
+            files[cls] = path
+    return files
+
+
+def write_synthetic_dbc(dbc_class, path, records, seed=0):
+    """Writes a DBC file of random records laid out like dbc_class.
+
+    The first field is the ID of a record, they are numbered from 1.
+    Strings are a few random words, only the first locale of a
+    Localization is set.
+
+    Args:
+        dbc_class: The DBCFile subclass whose skeleton is used.
+        path: The file to write.
+        records: The number of records.
+        seed: The seed of the random values.
+
+    """
+    rng = random.Random(seed)
+    strings = bytearray(b'\0')
+    offsets = {}
+
+    def add_string(text):
+        data = text.encode('utf-8')
+        if data not in offsets:
+            offsets[data] = len(strings)
+            strings.extend(data + b'\0')
+        return offsets[data]
+
+    def random_value(item, first):
+        if isinstance(item, String):
+            if not first:
+                return 0
+            return add_string(' '.join(rng.choice(_words) for _ in range(rng.randint(1, 4))))
+        if isinstance(item, Float):
+            return rng.uniform(0, 100)
+        if isinstance(item, Byte):
+            return rng.randint(0, 255)
+        if isinstance(item, (Int64, UInt64)):
+            return rng.randint(0, 1 << 40)
+        return rng.randint(0, 1000)
+
+    def template_row():
+        values = []
+        for field in dbc_class.skeleton:
+            if isinstance(field, PadByte):
+                continue
+            if isinstance(field, Array):
+                localized = isinstance(field, Localization)
+                for i, item in enumerate(field.items):
+                    if not isinstance(item, PadByte):
+                        values.append(random_value(item, not localized or i == 0))
+            else:
+                values.append(random_value(field, True))
+        return values
+
+    record_struct = dbc_class(path).struct
+    templates = [template_row() for _ in range(_SYNTHETIC_TEMPLATE_ROWS)]
+    with open(path, 'wb') as f:
+        block = bytearray()
+        for i in range(records):
+            values = templates[i % len(templates)]
+            values[0] = i + 1
+            block += record_struct.pack(*values)
+        f.write(DBCFile.header_struct.pack(
+            b'WDBC', records, record_struct.size // 4, record_struct.size, len(strings)))
+        f.write(block)
+        f.write(strings)
+
+
+def _max_rss_kb():
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes everywhere else.
+    return rss // 1024 if sys.platform == 'darwin' else rss
+
+
+def _measure(run, repeat):
+    """Times run, then runs it once more under tracemalloc.
+
+    Return:
+        A dict of the best time, the peak resident set size, and the peak and
+        retained bytes allocated during a run.
+
+    """
+    start_rss = _max_rss_kb()
+    times = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    peak_rss = _max_rss_kb()
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = run()
+        retained, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    del result
+
+    return {
+        'seconds': min(times),
+        'peak_rss_kb': peak_rss,
+        'rss_growth_kb': None if peak_rss is None else peak_rss - start_rss,
+        'peak_allocated_bytes': peak,
+        'retained_bytes': retained,
+    }
+
+
+def _run_benchmark(kind, name, path, repeat):
+    """Runs a single benchmark, in a worker process."""
+    directory = None
+    if kind == 'parse':
+        cls = dict((cls.__name__, cls) for cls in iter_dbc_classes())[name]
+
+        def run():
+            dbc = cls(path)
+            columns = dbc.read_columns()
+            return dbc, columns
+    else:
+        loader = dict((cls.__name__, cls) for cls in iter_loaders())[name]
+
+        def build():
+            dbc = loader.dbc_class(path)
+            dbc.open()
+            return dbc.records, loader.build_data(dbc)
+
+        if kind == 'load':
+            run = build
+        else:
+            directory = tempfile.mkdtemp()
+            snapshot = os.path.join(directory, '%s.snapshot' % name)
+
+            def run():
+                return read_snapshot(snapshot, path, 'benchmark')
+
+    dbc = (cls if kind == 'parse' else loader.dbc_class)(path)
+    dbc.open()
+    result = {
+        'kind': kind,
+        'name': name,
+        'file': os.path.basename(path),
+        'records': dbc.records,
+        'bytes': os.path.getsize(path),
+    }
+    dbc.close()
+
+    try:
+        if kind == 'snapshot':
+            write_snapshot(snapshot, path, 'benchmark', build())
+        result.update(_measure(run, repeat))
+    except Exception as e:
+        result['error'] = '%s: %s' % (type(e).__name__, e)
+        return result
+    finally:
+        if directory is not None:
+            shutil.rmtree(directory)
+
+    seconds = result['seconds'] or float('nan')
+    result['records_per_second'] = result['records'] / seconds
+    result['mb_per_second'] = result['bytes'] / seconds / (1 << 20)
+    return result
+
+
+def get_benchmarks(synthetic_directory=None, synthetic_records=0, names=None):
+    """The (kind, name, path, synthetic) of every benchmark to run.
+
+    Args:
+        synthetic_directory: Where the synthetic files are written.
+        synthetic_records: The number of records of each synthetic file, 0
+            to leave them out.
+        names: Only run the benchmarks of these DBCFile or loader names.
+
+    """
+    def wanted(*candidates):
+        return names is None or any(candidate in names for candidate in candidates)
+
+    shipped = get_shipped_files()
+    benchmarks = []
+    for cls, path in sorted(shipped.items(), key=lambda item: item[0].__name__):
+        if wanted(cls.__name__):
+            benchmarks.append(('parse', cls.__name__, path, False))
+    for loader in iter_loaders():
+        path = get_dbc_path(loader.dbc_name)
+        if os.path.exists(path) and wanted(loader.__name__, loader.dbc_class.__name__):
+            benchmarks.append(('load', loader.__name__, path, False))
+            benchmarks.append(('snapshot', loader.__name__, path, False))
+
+    if synthetic_records:
+        synthetic = {}
+        for cls in iter_dbc_classes():
+            if wanted(cls.__name__):
+                path = os.path.join(synthetic_directory, '%s.dbc' % cls.__name__[:-len('DBC')])
+                write_synthetic_dbc(cls, path, synthetic_records)
+                synthetic[cls] = path
+                benchmarks.append(('parse', cls.__name__, path, True))
+        for loader in iter_loaders():
+            if loader.dbc_class in synthetic and wanted(loader.__name__, loader.dbc_class.__name__):
+                benchmarks.append(('load', loader.__name__, synthetic[loader.dbc_class], True))
+    return benchmarks
+
+
+def run_benchmarks(synthetic_records=50000, repeat=3, names=None):
+    """Runs every benchmark, each in a new worker process.
+
+    Return:
+        A dict with the environment the benchmarks ran in and their results.
+
+    """
+    synthetic_directory = tempfile.mkdtemp()
+    try:
+        results = []
+        for kind, name, path, synthetic in get_benchmarks(synthetic_directory, synthetic_records, names):
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                result = executor.submit(_run_benchmark, kind, name, path, repeat).result()
+            result['synthetic'] = synthetic
+            results.append(result)
+    finally:
+        shutil.rmtree(synthetic_directory)
+
+    return {
+        'version': BENCHMARK_VERSION,
+        'commit': _get_commit(),
+        'date': datetime.datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'synthetic_records': synthetic_records,
+        'results': results,
+    }
+
+
+def _get_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'], cwd=dbc_path, stderr=subprocess.DEVNULL
+        ).decode('ascii').strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _key(result):
+    return (result['kind'], result['name'], result['synthetic'])
+
+
+def compare(previous, current, threshold=0.1):
+    """Compares the records per second of two runs.
+
+    Return:
+        A list of (key, previous, current, change, regressed) of the
+        benchmarks in both runs.  change is the relative change in records
+        per second, and regressed tells whether it is a slowdown of more than
+        threshold.
+
+    """
+    before = dict((_key(result), result) for result in previous['results'])
+    changes = []
+    for result in current['results']:
+        old = before.get(_key(result))
+        if old is None or 'error' in old or 'error' in result:
+            continue
+        change = result['records_per_second'] / old['records_per_second'] - 1
+        changes.append((_key(result), old['records_per_second'], result['records_per_second'], change,
+                        change < -threshold))
+    return changes
+
+
+def format_results(report):
+    lines = ['%-9s %-44s %9s %8s %13s %9s %10s %12s' % (
+        'kind', 'name', 'records', 'ms', 'records/s', 'MB/s', 'rss KB', 'peak alloc')]
+    for result in report['results']:
+        name = result['name'] + (' (synthetic)' if result['synthetic'] else '')
+        if 'error' in result:
+            lines.append('%-9s %-44s %9i  %s' % (result['kind'], name, result['records'], result['error']))
+            continue
+        lines.append('%-9s %-44s %9i %8.2f %13.0f %9.2f %10s %12i' % (
+            result['kind'], name, result['records'], result['seconds'] * 1000,
+            result['records_per_second'], result['mb_per_second'], result['peak_rss_kb'],
+            result['peak_allocated_bytes']))
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--output', help='Write the results as JSON to this file.')
+    parser.add_argument('--compare', help='Compare against the JSON results of a previous run.')
+    parser.add_argument('--synthetic-records', type=int, default=50000,
+                        help='The number of records of each synthetic file, 0 to skip them.')
+    parser.add_argument('--repeat', type=int, default=3, help='The number of timed runs.')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='The slowdown that counts as a regression.')
+    parser.add_argument('names', nargs='*', help='Only benchmark these DBCFile classes or loaders.')
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.synthetic_records, args.repeat, args.names or None)
+    print(format_results(report))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+        if previous.get('version') != BENCHMARK_VERSION:
+            print('%s is from another version of the benchmarks.' % args.compare)
+            return 1
+
+        regressions = 0
+        print('\n%-9s %-44s %13s %13s %8s' % ('kind', 'name', 'before', 'after', 'change'))
+        for (kind, name, synthetic), before, after, change, regressed in compare(
+                previous, report, args.threshold):
+            regressions += regressed
+            print('%-9s %-44s %13.0f %13.0f %+7.1f%%%s' % (
+                kind, name + (' (synthetic)' if synthetic else ''), before, after, change * 100,
+                '  REGRESSION' if regressed else ''))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
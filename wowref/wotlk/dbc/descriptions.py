@@ -0,0 +1,225 @@
+"""Compiles spell descriptions into token programs.
+
+A description such as "Heals $s1 over $d.$?s1234[][ Stacks up to $u times.]"
+is parsed once into a tuple of tokens, then every render only walks the
+tokens and looks up the spell data the references point at.
+
+Tokens are tuples whose first item is their kind:
+
+    (LITERAL, text)
+    (REFERENCE, Reference)       $s1, $12345o2, $/1000;S1, $d, ...
+    (DURATION,)                  $<duration>
+    (CONDITION, program)         $?s1234[true][false], only the false branch
+                                 is kept
+    (EVALUATE, program, round)   ${...}.2, program renders the expression
+    (PLURAL, singular, plural, text)
+                                 3 $lsec:secs;, the number is the one
+                                 rendered right before it
+"""
+import ast
+from collections import namedtuple
+from functools import lru_cache
+import operator
+import re
+
+# The number of compiled descriptions that are kept around.
+PROGRAM_CACHE_SIZE = 8192
+
+# The number of evaluated ${...} expressions that are kept around.
+EXPRESSION_CACHE_SIZE = 8192
+
+LITERAL, REFERENCE, DURATION, CONDITION, EVALUATE, PLURAL = range(6)
+
+Reference = namedtuple('Reference', 'operator rhs ref_id type index round text')
+
+# Descriptions that do not depend on the spell at all.
+_constants = (
+    ('$Ghe:she;', 'he or she'),
+    ('$<mult>', '1'),
+    ('$<threat>', '10'),
+)
+
+_reference_pattern = r"""
+        (?P<reference>
+            \$              # Start with a dollar sign
+            (?:             # our first match group for formula ( /1000;
+               (?P<f_operator>[/\+\-\*])   # Operator
+               (?P<f_rhs>\d+)            # Right hand side
+               ;
+            )?
+            (?P<ref_id>\d+)?
+            (?P<type>(?:SPH|MW|mw)|[hinuSmMsdDaotx])
+            (?P<index>\d+)?
+            (?:\.
+                (?P<round>\d+)
+            )?
+        )
+"""
+
+_condition_pattern = r"""
+        (?P<condition>
+            \$\?
+            \(? # Conditional match type
+                (?P<c_type>s)     # Search type s=spell, ???
+                (?P<c_ref_id>\d+)
+            \)? # Id to match
+            \[(?P<true>[^\]]*)\]   # True pred
+            \[(?P<false>[^\]]*)\]  # False pred
+        )
+"""
+
+_evaluate_pattern = r"""
+        (?P<evaluate>
+            \$\{
+                (?P<expression>[^\}]+)
+            \}
+            (?:\.
+                (?P<e_round>\d+)
+            )?
+        )
+"""
+
+_plural_pattern = r"""
+        (?P<plural>
+            \$l                     # matches things like 3 $lsec:secs;
+            (?P<singular>[^:]*):
+            (?P<plural_form>[^;]*);
+        )
+"""
+
+_duration_pattern = r'(?P<duration>\$<duration>)'
+
+_token_re = re.compile('|'.join((
+    _condition_pattern, _evaluate_pattern, _plural_pattern, _duration_pattern, _reference_pattern
+)), re.VERBOSE)
+
+# An expression can not hold another expression or a pluralizer.
+_expression_token_re = re.compile('|'.join((
+    _condition_pattern, _duration_pattern, _reference_pattern
+)), re.VERBOSE)
+
+_number_before_plural_re = re.compile(r'(\d+)\s\Z')
+
+_binary_operators = {
+    ast.Add: operator.add,
+    ast.Sub: operator.sub,
+    ast.Mult: operator.mul,
+    ast.Div: operator.truediv,
+}
+
+_unary_operators = {
+    ast.UAdd: operator.pos,
+    ast.USub: operator.neg,
+}
+
+
+@lru_cache(maxsize=PROGRAM_CACHE_SIZE)
+def compile_description(description):
+    """Compiles a description into a tuple of tokens.
+
+    The programs of the most recently used descriptions are cached.  They do
+    not depend on the spell, so spells sharing a description share a program.
+    """
+    for constant, value in _constants:
+        description = description.replace(constant, value)
+    return _compile(description, _token_re)
+
+
+def _compile(description, token_re):
+    program = []
+    position = 0
+    for m in token_re.finditer(description):
+        if m.start() > position:
+            program.append((LITERAL, description[position:m.start()]))
+        position = m.end()
+
+        groups = m.groupdict()
+        if groups['reference']:
+            program.append((REFERENCE, Reference(
+                groups['f_operator'],
+                float(groups['f_rhs']) if groups['f_rhs'] else None,
+                int(groups['ref_id']) if groups['ref_id'] else None,
+                groups['type'],
+                int(groups['index'] or 1) - 1,
+                int(groups['round']) if groups['round'] else None,
+                m.group(0)
+            )))
+        elif groups['duration']:
+            program.append((DURATION,))
+        elif groups['condition']:
+            program.append((CONDITION, _compile(groups['false'], _token_re)))
+        elif groups['evaluate']:
+            program.append((EVALUATE, _compile(groups['expression'], _expression_token_re),
+                            int(groups['e_round']) if groups['e_round'] else None))
+        else:
+            program.append((PLURAL, groups['singular'], groups['plural_form'], m.group(0)))
+
+    if position < len(description):
+        program.append((LITERAL, description[position:]))
+    return tuple(program)
+
+
+def render(program, spell_id, reference, duration, evaluate):
+    """Renders a compiled description.
+
+    Args:
+        program: A program from compile_description.
+        spell_id: The spell being described.
+        reference: A function of (spell_id, Reference) returning its text.
+        duration: A function of spell_id returning the duration in ms.
+        evaluate: A function of (expression, round) returning its text.
+
+    """
+    out = []
+    _render(program, out, spell_id, reference, duration, evaluate)
+    return ''.join(out)
+
+
+def _render(program, out, spell_id, reference, duration, evaluate):
+    for token in program:
+        kind = token[0]
+        if kind == LITERAL:
+            out.append(token[1])
+        elif kind == REFERENCE:
+            out.append(reference(spell_id, token[1]))
+        elif kind == DURATION:
+            out.append(str(duration(spell_id)))
+        elif kind == CONDITION:
+            _render(token[1], out, spell_id, reference, duration, evaluate)
+        elif kind == EVALUATE:
+            out.append(evaluate(render(token[1], spell_id, reference, duration, evaluate), token[2]))
+        else:
+            # The pluralizer picks a form from the number right before it.
+            text = ''.join(out)
+            m = _number_before_plural_re.search(text)
+            if m:
+                out[:] = [text[:m.end(1)], ' ', token[1] if int(m.group(1)) == 1 else token[2]]
+            else:
+                out[:] = [text, token[3]]
+
+
+@lru_cache(maxsize=EXPRESSION_CACHE_SIZE)
+def evaluate_expression(expression):
+    """Evaluates the arithmetic of a ${...} expression.
+
+    Only numbers, parentheses, unary + and - and the + - * / operators are
+    allowed, anything else raises a ValueError.  An expression is parsed and
+    evaluated once, the result is cached by its text.  References have
+    already been rendered into the text, so it is specific to a spell.
+
+    Raises:
+        SyntaxError: If the expression is not valid.
+        ValueError: If the expression uses anything but arithmetic.
+
+    """
+    return _evaluate_node(ast.parse(expression, mode='eval').body)
+
+
+def _evaluate_node(node):
+    if isinstance(node, ast.BinOp) and type(node.op) in _binary_operators:
+        return _binary_operators[type(node.op)](_evaluate_node(node.left), _evaluate_node(node.right))
+    if isinstance(node, ast.UnaryOp) and type(node.op) in _unary_operators:
+        return _unary_operators[type(node.op)](_evaluate_node(node.operand))
+    if isinstance(node, ast.Constant) and type(node.value) in (int, float):
+        return node.value
+    raise ValueError('Unsupported expression %s' % ast.dump(node))
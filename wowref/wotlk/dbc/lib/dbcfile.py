@@ -1,5 +1,8 @@
 #!/usr/bin/env python
 
+from array import array
+import mmap
+from operator import itemgetter
 import os
 from struct import Struct
 
@@ -8,23 +11,126 @@ from .dtypes import *
 UNICODE_BLANK = ''
 
 
-class DBCRecord(object):
-    """A simple object to convert a dict to an object."""
-    def __init__(self, d=None):
-        self.data = d
+class DBCRecord(tuple):
+    """Base class of the record types compiled from a DBCFile skeleton.
+
+    A record is a tuple of the field values in skeleton order, Array fields
+    being nested tuples.  Each field is exposed as a property of the same
+    name, String fields are decoded through the DBCFile when accessed.
+    """
+    __slots__ = ()
+
+    _fields = ()
+    dbc = None
+
+    def __repr__(self):
+        return "<%s %r>" % (type(self).__name__, self._asdict())
+
+    def _asdict(self):
+        """A new dict of the field names and their (decoded) values.
+
+        This is the supported way for loaders to derive their own structure
+        from a record, since records themselves are immutable.
+        """
+        return dict((name, getattr(self, name)) for name in self._fields)
+
+
+def compile_record_type(name, skeleton):
+    """Compiles a skeleton into a DBCRecord subclass.
+
+    Returns:
+        A tuple of the record type and a function that groups the flat values
+        unpacked from a record into the nested tuple the type expects, or
+        None when the skeleton has no Array fields.
+
+    """
+    namespace = {'__slots__': (), '_fields': ()}
+    fields = []
+    group = []
+    index = 0
+    for field in skeleton:
+        if isinstance(field, PadByte):
+            continue
+
+        i = len(fields)
+        fields.append(field.name)
+        if isinstance(field, Array):
+            count = len([item for item in field.items if not isinstance(item, PadByte)])
+            group.append(slice(index, index + count))
+            index += count
+
+            string_count = sum(isinstance(item, String) for item in field.items)
+            if string_count:
+                namespace[field.name] = property(
+                    lambda self, i=i, n=string_count: DBCStrings(self.dbc, self[i], n))
+            else:
+                namespace[field.name] = property(itemgetter(i))
+        else:
+            group.append(index)
+            index += 1
+
+            if isinstance(field, String):
+                namespace[field.name] = property(
+                    lambda self, i=i: self.dbc.get_string(self[i]))
+            else:
+                namespace[field.name] = property(itemgetter(i))
+
+    namespace['_fields'] = tuple(fields)
+    if len(group) == index:
+        group = None
+    elif len(group) == 1:
+        # itemgetter only returns a tuple when it has several items.
+        getter = itemgetter(group[0])
+        group = lambda values: (getter(values),)
+    else:
+        # The index of each plain field and the slice of each Array field.
+        group = itemgetter(*group)
+    return type(str(name), (DBCRecord,), namespace), group
+
+
+class DBCStrings(object):
+    """A lazy sequence of String fields, such as a Localization.
+
+    Only the offsets into the string block are stored, an item is decoded
+    the first time it is accessed.  Members that are not strings, like the
+    flags at the end of a Localization, are returned as is.
+    """
+    def __init__(self, dbc, values, string_count):
+        self.dbc = dbc
+        self.values = values
+        self.string_count = string_count
 
     def __repr__(self):
-        return "<DBCRecord %r>" % self.data
+        return "<DBCStrings %r>" % list(self)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        value = self.values[index]
+        if index % len(self.values) < self.string_count:
+            value = self.dbc.get_string(value)
+        return value
+
+    def __eq__(self, other):
+        if isinstance(other, (DBCStrings, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
 
-    def __getitem__(self, item):
-        print('hi')
-        return self.data[item]
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
 
-    def __getattr__(self, item):
-        item = self.data[item]
-        if isinstance(item, bytes):
-            item = item.decode('utf-8')
-        return item
+    __hash__ = None
+
+    @property
+    def text(self):
+        """The string for the locale selected on the DBCFile."""
+        return self[self.dbc.locale]
 
 
 class DBCFile(object):
@@ -32,26 +138,95 @@ class DBCFile(object):
 
     header_struct = Struct('4s4i')
 
-    def __init__(self, filename, skele=None, verbose=False):
+    # Compiled (record type, group function) for each DBCFile subclass.
+    _record_types = {}
+
+    def __init__(self, filename, skele=None, verbose=False, use_mmap=True, locale=0):
         self.filename = filename
+        self.use_mmap = use_mmap
+        # The Localization slot that is used by default, 0 is enUS.
+        self.locale = locale
         if not hasattr(self, 'skeleton'):
             self.skeleton = skele
+        self._buffer = None
+        self._strings = {0: UNICODE_BLANK}
         self.__create_struct()
 
     def __iter__(self):
         """Iterated based approach to the dbc reading."""
+        self.open()
+        unpack_from = self.struct.unpack_from
+        record_block = self.record_block
+        record_type = self.record_type
+        group = self.record_group
+
+        for offset in range(0, self.records * self.record_size, self.record_size):
+            values = unpack_from(record_block, offset)
+            yield record_type(group(values) if group else values)
+
+    def read_columns(self):
+        """Bulk reads every record of the file into per-field columns.
+
+        The whole record block is unpacked in a single pass and transposed,
+        so numeric fields are available as vectors without building a record
+        per row.
+
+        Returns:
+            DBCColumns: The columns of the file, keyed by field name.
+
+        """
+        self.open()
+        values = list(zip(*self.struct.iter_unpack(self.record_block)))
+        if not values:
+            values = [()] * len(self.struct.unpack(bytes(self.record_size)))
+        values = iter(values)
+
+        columns = {}
+        for field in self.skeleton:
+            if isinstance(field, Array):
+                columns[field.name] = [
+                    array(item.c, next(values)) for item in field.items
+                    if not isinstance(item, PadByte)
+                ]
+            elif not isinstance(field, PadByte):
+                columns[field.name] = array(field.c, next(values))
+        return DBCColumns(self, columns)
+
+    def record(self, i):
+        """The raw bytes of the record at index i, as a memoryview."""
+        self.open()
+        return self.record_block[i * self.record_size:(i + 1) * self.record_size]
+
+    def open(self):
+        """Maps the file into memory and reads the header.
+
+        With use_mmap the file is mmap'ed read only, so every process reading
+        the same file shares a single page cache copy of it.  Otherwise the
+        whole file is read in one call.  Either way, record_block and
+        string_block are memoryview slices of that buffer, nothing is copied.
+
+        """
+        if self._buffer is not None:
+            return
+
         if not os.path.exists(self.filename):
             raise Exception("File '%s' not found" % (self.filename,))
 
-        f = open(self.filename, 'rb')
-        f_read = f.read
+        with open(self.filename, 'rb') as f:
+            if self.use_mmap:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            else:
+                buffer = f.read()
+
+        if len(buffer) < self.header_struct.size:
+            raise Exception('Invalid file type')
+
         # Read in header
         sig, records, fields, record_size, string_block_size = \
-            self.header_struct.unpack(f_read(20))
+            self.header_struct.unpack_from(buffer)
 
         # Check signature
         if sig != b'WDBC':
-            f.close()
             raise Exception('Invalid file type')
 
         self.records = records
@@ -66,21 +241,43 @@ class DBCFile(object):
 
         # Ensure that struct and record_size is the same
         if self.struct.size != record_size:
-            f.close()
             raise Exception('Struct size mismatch (%d != %d)' %
                             (self.struct.size, record_size))
-        struct_unpack = self.struct.unpack
 
-        # Read in string block
-        f.seek(20 + records * record_size)
-        self.string_block = f_read(string_block_size)
-        f.seek(20)
+        view = memoryview(buffer)
+        self.string_block_offset = self.header_struct.size + records * record_size
+        self.record_block = view[self.header_struct.size:self.string_block_offset]
+        self.string_block = view[self.string_block_offset:self.string_block_offset + string_block_size]
+        self._buffer = buffer
 
+    def close(self):
+        """Drops the file buffer.
+
+        The mapping itself is released once every memoryview handed out from
+        it has been garbage collected.
+
+        """
+        self._buffer = self.record_block = self.string_block = None
+        self._strings = {0: UNICODE_BLANK}
+
+    def get_string(self, offset):
+        """Decodes the string at offset in the string block.
+
+        Each offset is only decoded once, the result is cached so every record
+        pointing at the same offset shares a single str.
+
+        """
         try:
-            for i in range(records):
-                yield self.__process_record(struct_unpack(f_read(record_size)))
-        finally:
-            f.close()
+            return self._strings[offset]
+        except KeyError:
+            pass
+
+        if offset > self.string_block_size or self.string_block[offset - 1] != 0:
+            raise Exception('Invalid string')
+        end = self._buffer.find(b'\0', self.string_block_offset + offset)
+        string = str(self.string_block[offset:end - self.string_block_offset], 'utf-8')
+        self._strings[offset] = string
+        return string
 
     def __create_struct(self):
         """Creates a Struct from the Skeleton."""
@@ -92,32 +289,82 @@ class DBCFile(object):
                 else:
                     s.append(item.c)
             self.struct = Struct(''.join(s))
+
+            # The record type is compiled once per DBCFile subclass, then bound
+            # to this file so its String fields decode from our string block.
+            cls = type(self)
+            if self.skeleton is getattr(cls, 'skeleton', None):
+                if cls not in DBCFile._record_types:
+                    DBCFile._record_types[cls] = compile_record_type(
+                        cls.__name__.replace('DBC', '') + 'Record', self.skeleton)
+                record_type, self.record_group = DBCFile._record_types[cls]
+            else:
+                record_type, self.record_group = compile_record_type('DBCRecord', self.skeleton)
+            self.record_type = type(record_type.__name__, (record_type,),
+                                    {'__slots__': (), 'dbc': self})
         else:
             self.struct = None
+            self.record_type = self.record_group = None
 
-    def __process_record(self, data):
-        """Processes a record (row of data)."""
-        output = {}
-        data_iter = iter(data)
-        for field in self.skeleton:
+    def _process_record(self, data):
+        """Processes a record (row of data).
+
+        String fields are left as offsets, they are decoded when accessed.
+        """
+        if self.record_group:
+            data = self.record_group(data)
+        return self.record_type(data)
+
+
+class DBCColumns(object):
+    """The records of a DBC file stored column by column.
+
+    Numeric fields are stored as an array.array per field, Array fields as a
+    list of arrays (one per element), and String fields as arrays of string
+    block offsets that are only decoded when asked for.
+    """
+    def __init__(self, dbc, columns):
+        self.dbc = dbc
+        self.columns = columns
+
+    def __repr__(self):
+        return "<DBCColumns %s: %i records>" % (self.dbc.filename, len(self))
+
+    def __len__(self):
+        return self.dbc.records
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __contains__(self, name):
+        return name in self.columns
+
+    def strings(self, name, index=None):
+        """The decoded strings of a String field.
+
+        Args:
+            name: The name of the String, Localization or String Array field.
+            index: For Localization and String Array fields, the element to
+                decode.  Defaults to the locale selected on the DBCFile.
+
+        """
+        offsets = self.columns[name]
+        if isinstance(offsets, list):
+            offsets = offsets[self.dbc.locale if index is None else index]
+        get_string = self.dbc.get_string
+        return [get_string(offset) for offset in offsets]
+
+    def row(self, i):
+        """Materializes the record at index i."""
+        data = []
+        for field in self.dbc.skeleton:
             if isinstance(field, Array):
-                output[field.name] = [
-                    self.__process_field(item, next(data_iter)) for item in field.items
-                    if not isinstance(item, PadByte)
-                ]
+                data.extend(column[i] for column in self.columns[field.name])
             elif not isinstance(field, PadByte):
-                output[field.name] = self.__process_field(field, next(data_iter))
-        return DBCRecord(output)
-
-    def __process_field(self, _type, data):
-        output = data
-        if isinstance(_type, String):
-            if data == 0:
-                output = UNICODE_BLANK
-            else:
-                if data > self.string_block_size or self.string_block[data - 1] != 0:
-                    raise Exception('Invalid string')
-                output = self.string_block[data:self.string_block.find(0, data)]
-        if isinstance(output, bytes):
-            output = output.decode('utf-8')
-        return output
+                data.append(self.columns[field.name][i])
+        return self.dbc._process_record(tuple(data))
+
+    def rows(self):
+        """Iterates over every record, materializing them one at a time."""
+        for i in range(len(self)):
+            yield self.row(i)
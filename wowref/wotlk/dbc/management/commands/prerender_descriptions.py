@@ -0,0 +1,21 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from wotlk.dbc import prerender_spell_descriptions
+
+
+class Command(BaseCommand):
+    help = 'Renders every spell description into a snapshot that is looked up at runtime.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--processes', type='int', default=None,
+                    help='The number of worker processes, defaults to the number of CPUs.'),
+    )
+
+    def handle(self, *args, **options):
+        stored, total, failed = prerender_spell_descriptions(processes=options['processes'])
+        self.stdout.write('Prerendered %i of %i spell descriptions.' % (stored, total))
+        if failed:
+            self.stderr.write('The descriptions of %i spells failed to format: %s' %
+                              (len(failed), ', '.join(str(id) for id in failed)))
@@ -0,0 +1,311 @@
+"""Versioned binary snapshots of the data built by the DBC loaders.
+
+A snapshot is a single file holding a pickled header and a pickled payload.
+The header records what the payload was built from: the source file's size,
+mtime and sha1, the structure of the DBCFile skeleton and the version of the
+loader.  If any of those change the snapshot is stale and gets rebuilt.
+
+Snapshots are written to a temporary file and renamed into place, so a
+reader never sees a partially written snapshot.  When a source was touched
+without changing, such as by a checkout, its new mtime is written back into
+the snapshot so the next start does not hash the source again.
+
+Keyed snapshots map int keys to byte strings.  They are memory mapped instead
+of unpickled, so opening one costs nothing and every process shares a single
+copy of it.
+"""
+from array import array
+from bisect import bisect_left
+import hashlib
+import mmap
+import os
+import pickle
+import struct
+import tempfile
+
+SNAPSHOT_MAGIC = b'WRSNAP01'
+KEYED_SNAPSHOT_MAGIC = b'WRKEYS01'
+_length_struct = struct.Struct('<I')
+
+# The umask can only be read by setting it, so it is read once at import
+# rather than racing other threads on every write.
+_umask = os.umask(0)
+os.umask(_umask)
+
+
+class StaleSnapshot(Exception):
+    """Raised when a snapshot is missing, corrupt or out of date."""
+
+
+def file_sha1(filename):
+    """The hex sha1 of the contents of filename."""
+    h = hashlib.sha1()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def skeleton_signature(dbc):
+    """A short string identifying the layout of a DBCFile's skeleton.
+
+    It changes whenever a field is added, removed, renamed or changes type.
+    """
+    signature = '%s|%s' % (dbc.struct.format, ','.join(dbc.record_type._fields))
+    return hashlib.sha1(signature.encode('utf-8')).hexdigest()
+
+
+def source_key(filename):
+    """The size, mtime and sha1 of a source file.
+
+    The sha1 is only computed when it is asked for, since comparing the size
+    and mtime is usually enough to know that nothing changed.
+    """
+    st = os.stat(filename)
+    return {'size': st.st_size, 'mtime': st.st_mtime_ns, 'sha1': None}
+
+
+def read_snapshot(path, source, version):
+    """Reads a snapshot in one call, checking it is still valid.
+
+    Args:
+        path: The snapshot file.
+        source: The path of the file the snapshot was built from, or None
+            when it was built from the database and only version tells
+            whether it is current.
+        version: Any picklable value identifying the code that built it, such
+            as (skeleton signature, loader version).  It must compare equal to
+            the version stored in the snapshot.
+
+    Returns:
+        The payload that was stored with write_snapshot.
+
+    Raises:
+        StaleSnapshot: If the snapshot is missing, unreadable, or was built
+            from a different source or version.
+
+    """
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+    except (IOError, OSError):
+        raise StaleSnapshot('No snapshot at %s' % path)
+
+    try:
+        if not data.startswith(SNAPSHOT_MAGIC):
+            raise ValueError('Bad magic')
+        offset = len(SNAPSHOT_MAGIC)
+        header_length, = _length_struct.unpack_from(data, offset)
+        offset += _length_struct.size
+        header = pickle.loads(data[offset:offset + header_length])
+        if not isinstance(header, dict):
+            raise ValueError('Bad header')
+        offset += header_length
+    except Exception as e:
+        raise StaleSnapshot('Corrupt snapshot %s: %s' % (path, e))
+
+    if header.get('version') != version:
+        raise StaleSnapshot('Snapshot %s has a different version' % path)
+
+    refreshed = None
+    if source is not None:
+        refreshed = _check_source(path, source, header.get('source') or {})
+
+    try:
+        payload = pickle.loads(data[offset:])
+    except Exception as e:
+        raise StaleSnapshot('Corrupt snapshot %s: %s' % (path, e))
+
+    if refreshed is not None:
+        header['source'] = refreshed
+        header = pickle.dumps(header, pickle.HIGHEST_PROTOCOL)
+        _rewrite(path, (SNAPSHOT_MAGIC, _length_struct.pack(len(header)), header, data[offset:]))
+    return payload
+
+
+def _check_source(path, source, stored):
+    """Raises StaleSnapshot if source changed since stored was taken.
+
+    Return:
+        None if the size and mtime of source still match stored, or the new
+        key of source if only its mtime changed and its contents did not.
+
+    """
+    try:
+        key = source_key(source)
+    except OSError:
+        raise StaleSnapshot('Snapshot %s source %s is missing' % (path, source))
+    if (key['size'], key['mtime']) == (stored.get('size'), stored.get('mtime')):
+        return None
+    # The file was touched or replaced, it is only stale if the contents
+    # changed.
+    if key['size'] != stored.get('size') or file_sha1(source) != stored.get('sha1'):
+        raise StaleSnapshot('Snapshot %s is older than %s' % (path, source))
+    key['sha1'] = stored['sha1']
+    return key
+
+
+def _rewrite(path, chunks):
+    """Rewrites a snapshot whose source keys were refreshed.
+
+    The snapshot is still valid when this fails, so it is only an
+    optimization and a read only snapshot directory is not an error.
+    """
+    try:
+        _write_atomic(path, chunks)
+    except (IOError, OSError):
+        pass
+
+
+def write_snapshot(path, source, version, payload):
+    """Atomically writes payload to a snapshot at path.
+
+    Args:
+        path: The snapshot file.
+        source: The path of the file the payload was built from, or None.
+        version: See read_snapshot.
+        payload: Any picklable object.
+
+    """
+    stored_source = _stored_source_key(source) if source is not None else None
+    header = pickle.dumps({'version': version, 'source': stored_source}, pickle.HIGHEST_PROTOCOL)
+    payload = pickle.dumps(payload, pickle.HIGHEST_PROTOCOL)
+    _write_atomic(path, (SNAPSHOT_MAGIC, _length_struct.pack(len(header)), header, payload))
+
+
+def _stored_source_key(source):
+    key = source_key(source)
+    key['sha1'] = file_sha1(source)
+    return key
+
+
+def _write_atomic(path, chunks):
+    """Writes chunks to a temporary file and renames it to path."""
+    directory = os.path.dirname(path)
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in chunks:
+                f.write(chunk)
+        # mkstemp creates the file readable by its owner only, give it the
+        # permissions of a regular file so the snapshots built by a
+        # management command can be read by the web server.
+        os.chmod(tmp_path, 0o666 & ~_umask)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+def _pad_keyed_header(header):
+    """Pads a pickled keyed snapshot header so the keys are 8 byte aligned."""
+    return header + bytes(-(len(KEYED_SNAPSHOT_MAGIC) + _length_struct.size + len(header)) % 8)
+
+
+def write_keyed_snapshot(path, sources, version, items):
+    """Atomically writes a keyed snapshot.
+
+    The file is the magic, a pickled header padded to 8 bytes, then the
+    number of keys, the sorted keys, the offset of each value and the values.
+
+    Args:
+        path: The snapshot file.
+        sources: The paths of the files the values were built from.
+        version: See read_snapshot.
+        items: An iterable of (int key, bytes value).
+
+    """
+    items = sorted(items)
+    keys = array('i', [key for key, _ in items])
+    offsets = array('I', [0])
+    for _, value in items:
+        offsets.append(offsets[-1] + len(value))
+
+    header = pickle.dumps({
+        'version': version,
+        'sources': [_stored_source_key(source) for source in sources]
+    }, pickle.HIGHEST_PROTOCOL)
+    header = _pad_keyed_header(header)
+    _write_atomic(path, [
+        KEYED_SNAPSHOT_MAGIC, _length_struct.pack(len(header)), header,
+        _length_struct.pack(len(keys)), keys.tobytes(), offsets.tobytes(),
+    ] + [value for _, value in items])
+
+
+class KeyedSnapshot(object):
+    """A memory mapped keyed snapshot.
+
+    Args:
+        path: The snapshot file.
+        sources: The paths of the files the values were built from, in the
+            order they were given to write_keyed_snapshot.
+        version: See read_snapshot.
+
+    Raises:
+        StaleSnapshot: If the snapshot is missing, corrupt, or was built from
+            different sources or a different version.
+
+    """
+    def __init__(self, path, sources, version):
+        try:
+            with open(path, 'rb') as f:
+                buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError):
+            raise StaleSnapshot('No snapshot at %s' % path)
+
+        try:
+            if buffer[:len(KEYED_SNAPSHOT_MAGIC)] != KEYED_SNAPSHOT_MAGIC:
+                raise ValueError('Bad magic')
+            offset = len(KEYED_SNAPSHOT_MAGIC)
+            header_length, = _length_struct.unpack_from(buffer, offset)
+            offset += _length_struct.size
+            header = pickle.loads(buffer[offset:offset + header_length])
+            if not isinstance(header, dict):
+                raise ValueError('Bad header')
+            offset += header_length
+            body_offset = offset
+            count, = _length_struct.unpack_from(buffer, offset)
+            offset += _length_struct.size
+
+            view = memoryview(buffer)
+            self.keys = view[offset:offset + 4 * count].cast('i')
+            offset += 4 * count
+            self.offsets = view[offset:offset + 4 * (count + 1)].cast('I')
+            offset += 4 * (count + 1)
+            self.values = view[offset:]
+            if len(self.values) != self.offsets[-1]:
+                raise ValueError('Truncated')
+        except Exception as e:
+            raise StaleSnapshot('Corrupt snapshot %s: %s' % (path, e))
+
+        if header.get('version') != version:
+            raise StaleSnapshot('Snapshot %s has a different version' % path)
+        stored = header.get('sources', [])
+        if len(stored) != len(sources):
+            raise StaleSnapshot('Snapshot %s has different sources' % path)
+        refreshed = [_check_source(path, source, key) for source, key in zip(sources, stored)]
+        if any(key is not None for key in refreshed):
+            header['sources'] = [new or old for new, old in zip(refreshed, stored)]
+            header = _pad_keyed_header(pickle.dumps(header, pickle.HIGHEST_PROTOCOL))
+            _rewrite(path, (KEYED_SNAPSHOT_MAGIC, _length_struct.pack(len(header)), header,
+                            buffer[body_offset:]))
+
+    def get(self, key, default=None):
+        """The bytes stored for key, or default."""
+        index = bisect_left(self.keys, key)
+        if index < len(self.keys) and self.keys[index] == key:
+            return bytes(self.values[self.offsets[index]:self.offsets[index + 1]])
+        return default
+
+    def __contains__(self, key):
+        index = bisect_left(self.keys, key)
+        return index < len(self.keys) and self.keys[index] == key
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __iter__(self):
+        return iter(self.keys)
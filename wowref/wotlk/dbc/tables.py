@@ -0,0 +1,272 @@
+"""Compact lookup tables for integer keyed DBC data."""
+from array import array
+from bisect import bisect_left
+
+# A dense table is used as long as it would have at most this many slots per
+# key, the unused slots cost one byte of presence plus the size of a value.
+DENSE_SLOTS_PER_KEY = 4
+
+_int_typecodes = ('b', 'h', 'i', 'q')
+
+
+def smallest_int_typecode(values):
+    """The smallest signed array typecode that can hold every value."""
+    if not values:
+        return 'b'
+    low, high = min(values), max(values)
+    for typecode in _int_typecodes:
+        bits = array(typecode).itemsize * 8 - 1
+        if -(1 << bits) <= low and high < (1 << bits):
+            return typecode
+    raise OverflowError('Values do not fit in 64 bits')
+
+
+class IntTable(object):
+    """A read only mapping of int keys to one or more numeric columns.
+
+    The values are stored in array.arrays instead of a dict of boxed ints.
+    When the keys are dense enough the value of key k is stored at index
+    k - offset, so lookups are a single index.  Otherwise the keys are kept
+    sorted and looked up with a binary search.
+
+    With a single value column, table[key] is that value.  With several,
+    it is a tuple of the values, one per column.
+    """
+    __slots__ = ('offset', 'sorted_keys', 'present', 'columns', 'length')
+
+    def __init__(self, keys, *columns):
+        if not columns:
+            raise TypeError('IntTable needs at least one value column')
+
+        # Like dict(zip(keys, values)), the last value of a repeated key wins.
+        positions = dict((key, i) for i, key in enumerate(keys))
+        keys = sorted(positions)
+        order = [positions[key] for key in keys]
+        self.length = len(keys)
+
+        typed_columns = []
+        for column in columns:
+            typecode = getattr(column, 'typecode', None)
+            values = [column[i] for i in order]
+            if typecode is None or typecode in 'bBhHiIlLqQ':
+                typecode = smallest_int_typecode(values)
+            typed_columns.append((typecode, values))
+
+        span = keys[-1] - keys[0] + 1 if keys else 0
+        if span <= DENSE_SLOTS_PER_KEY * max(len(keys), 1):
+            self.offset = keys[0] if keys else 0
+            self.sorted_keys = None
+            self.present = bytearray(span)
+            self.columns = tuple(array(typecode, bytes(span * array(typecode).itemsize))
+                                 for typecode, _ in typed_columns)
+            for i, key in enumerate(keys):
+                index = key - self.offset
+                self.present[index] = 1
+                for column, (_, values) in zip(self.columns, typed_columns):
+                    column[index] = values[i]
+        else:
+            self.offset = None
+            self.sorted_keys = array(smallest_int_typecode(keys), keys)
+            self.present = None
+            self.columns = tuple(array(typecode, values) for typecode, values in typed_columns)
+
+    @classmethod
+    def from_dict(cls, d):
+        """Builds a single column table from a dict."""
+        keys = list(d)
+        return cls(keys, [d[k] for k in keys])
+
+    def _index(self, key):
+        """The index of key in the columns, or -1 if there is none."""
+        if not isinstance(key, int):
+            return -1
+        if self.sorted_keys is None:
+            index = key - self.offset
+            if 0 <= index < len(self.present) and self.present[index]:
+                return index
+        else:
+            index = bisect_left(self.sorted_keys, key)
+            if index < self.length and self.sorted_keys[index] == key:
+                return index
+        return -1
+
+    def _value(self, index):
+        if len(self.columns) == 1:
+            return self.columns[0][index]
+        return tuple(column[index] for column in self.columns)
+
+    def __getitem__(self, key):
+        index = self._index(key)
+        if index < 0:
+            raise KeyError(key)
+        return self._value(index)
+
+    def get(self, key, default=None):
+        index = self._index(key)
+        if index < 0:
+            return default
+        return self._value(index)
+
+    def __contains__(self, key):
+        return self._index(key) >= 0
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        if self.sorted_keys is not None:
+            return iter(self.sorted_keys)
+        return (i + self.offset for i, present in enumerate(self.present) if present)
+
+    def keys(self):
+        return list(self)
+
+    def items(self):
+        for key in self:
+            yield key, self[key]
+
+    def __eq__(self, other):
+        if not isinstance(other, IntTable):
+            return NotImplemented
+        return list(self.items()) == list(other.items())
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '<IntTable %i keys, %s>' % (self.length, 'dense' if self.sorted_keys is None else 'sparse')
+
+
+class ColumnStore(object):
+    """Rows keyed by an int id, stored column by column.
+
+    Numeric columns are arrays of a fixed width per row, a width 3 column
+    holds the 3 values of a row next to each other.  String columns share a
+    single pool, each distinct string is stored once and the column only holds
+    its index in the pool.
+
+    Args:
+        ids: The id of each row.
+        columns: A dict of column name to a list of arrays, one array per
+            element of the column, each with a value per row.  A scalar column
+            is a list with a single array.
+        string_columns: A dict of column name to a list of strings, one per row.
+
+    """
+    __slots__ = ('rows', 'columns', 'widths', 'strings', 'string_columns')
+
+    def __init__(self, ids, columns, string_columns):
+        self.rows = IntTable(ids, range(len(ids)))
+        self.columns = {}
+        self.widths = {}
+        for name, elements in columns.items():
+            typecode = elements[0].typecode
+            if typecode in 'bBhHiIlLqQ':
+                typecode = smallest_int_typecode([v for element in elements for v in element])
+            values = zip(*elements)
+            self.columns[name] = array(typecode, [v for row in values for v in row])
+            self.widths[name] = len(elements)
+
+        pool = {}
+        self.string_columns = {}
+        for name, strings in string_columns.items():
+            indexes = [pool.setdefault(string, len(pool)) for string in strings]
+            self.string_columns[name] = array(smallest_int_typecode(indexes), indexes)
+        self.strings = sorted(pool, key=pool.__getitem__)
+
+    def get(self, id, name):
+        """The value of column name for the row with id.
+
+        Returns:
+            The value for scalar and string columns, a list of the values for
+            wider columns.
+
+        Raises:
+            KeyError: If there is no row with that id.
+
+        """
+        row = self.rows[id]
+        if name in self.string_columns:
+            return self.strings[self.string_columns[name][row]]
+        width = self.widths[name]
+        if width == 1:
+            return self.columns[name][row]
+        return self.columns[name][row * width:(row + 1) * width].tolist()
+
+    def __contains__(self, id):
+        return id in self.rows
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class IntMultiTable(object):
+    """A read only mapping of int keys to tuples of ints.
+
+    The values of every key are stored next to each other in one array,
+    ordered by key, and the keys are kept sorted with the offset of their
+    first value.  A lookup is a binary search and a slice.
+
+    Args:
+        pairs: (key, value) pairs.  The values of a key keep the order they
+            are given in, a repeated pair is kept once.
+
+    """
+    __slots__ = ('sorted_keys', 'offsets', 'values')
+
+    def __init__(self, pairs):
+        grouped = {}
+        for key, value in pairs:
+            values = grouped.setdefault(key, [])
+            if value not in values:
+                values.append(value)
+
+        keys = sorted(grouped)
+        values = [value for key in keys for value in grouped[key]]
+        offsets = [0]
+        for key in keys:
+            offsets.append(offsets[-1] + len(grouped[key]))
+
+        self.sorted_keys = array(smallest_int_typecode(keys), keys)
+        self.offsets = array(smallest_int_typecode(offsets), offsets)
+        self.values = array(smallest_int_typecode(values), values)
+
+    def _index(self, key):
+        if not isinstance(key, int):
+            return -1
+        index = bisect_left(self.sorted_keys, key)
+        if index < len(self.sorted_keys) and self.sorted_keys[index] == key:
+            return index
+        return -1
+
+    def __getitem__(self, key):
+        index = self._index(key)
+        if index < 0:
+            raise KeyError(key)
+        return tuple(self.values[self.offsets[index]:self.offsets[index + 1]])
+
+    def get(self, key, default=()):
+        index = self._index(key)
+        if index < 0:
+            return default
+        return tuple(self.values[self.offsets[index]:self.offsets[index + 1]])
+
+    def __contains__(self, key):
+        return self._index(key) >= 0
+
+    def __len__(self):
+        return len(self.sorted_keys)
+
+    def __iter__(self):
+        return iter(self.sorted_keys)
+
+    def __repr__(self):
+        return '<IntMultiTable %i keys, %i values>' % (len(self.sorted_keys), len(self.values))
@@ -1,7 +1,21 @@
+import os
+import pickle
+import shutil
+import stat
+import struct
+import tempfile
+from array import array
+
 from django.test import TestCase
 
-from . import date_diff, CharClass, CharRace, CharTitle, Spell, Zone, \
-    ItemClass
+from . import date_diff, get_dbc_path, _read_loader_data, CharClass, CharRace, \
+    CharTitle, GemProperties, ItemSet, Spell, SpellDuration, SpellRadius, Zone, ItemClass
+from .descriptions import compile_description, evaluate_expression, render, CONDITION, LITERAL, REFERENCE
+from .tables import ColumnStore, IntMultiTable, IntTable
+from .benchmarks import write_synthetic_dbc
+from .snapshots import read_snapshot, write_keyed_snapshot, write_snapshot, KeyedSnapshot, StaleSnapshot, \
+    SNAPSHOT_MAGIC, _umask
+from .lib import CharClassDBC, DBCRecord, ItemSetDBC, SpellDurationDBC, SpellIconDBC
 
 
 class CharClassTests(TestCase):
@@ -16,6 +30,332 @@ class CharRaceTests(TestCase):
         self.assertEqual(CharRace.get_name(4), "Night Elf")
 
 
+class DBCColumnsTests(TestCase):
+    def test_columns_match_records(self):
+        dbc = SpellDurationDBC(get_dbc_path('SpellDuration'))
+        columns = dbc.read_columns()
+        records = list(dbc)
+
+        self.assertEqual(len(records), len(columns))
+        self.assertEqual([f.ID for f in records], list(columns['ID']))
+        self.assertEqual([f.BaseDuration for f in records], list(columns['BaseDuration']))
+
+    def test_array_and_localization_columns(self):
+        dbc = ItemSetDBC(get_dbc_path('ItemSet'))
+        columns = dbc.read_columns()
+        first = next(iter(dbc))
+
+        self.assertEqual(17, len(columns['Items']))
+        self.assertEqual(list(first.Items), [column[0] for column in columns['Items']])
+        self.assertEqual(first.DisplayName[0], columns.strings('DisplayName', 0)[0])
+        self.assertEqual(first, columns.row(0))
+
+
+class DBCFileMappingTests(TestCase):
+    def test_mmap_and_read_agree(self):
+        mapped = list(ItemSetDBC(get_dbc_path('ItemSet')))
+        read = list(ItemSetDBC(get_dbc_path('ItemSet'), use_mmap=False))
+        self.assertEqual(mapped, read)
+
+    def test_record_is_a_view(self):
+        dbc = SpellDurationDBC(get_dbc_path('SpellDuration'))
+        record = dbc.record(0)
+
+        self.assertIsInstance(record, memoryview)
+        self.assertEqual(dbc.record_size, len(record))
+        self.assertEqual(next(iter(dbc)).ID, dbc.struct.unpack(record)[0])
+
+
+class DBCStringTests(TestCase):
+    def test_strings_are_decoded_on_access(self):
+        dbc = SpellIconDBC(get_dbc_path('SpellIcon'))
+        record = next(iter(dbc))
+
+        self.assertIsInstance(record[1], int)
+        self.assertNotIn(record[1], dbc._strings)
+        icon = record.Icon
+        self.assertIs(icon, dbc.get_string(record[1]))
+
+    def test_locale_selector(self):
+        record = next(iter(CharClassDBC(get_dbc_path('ChrClasses'))))
+        self.assertEqual("Warrior", record.name.text)
+        self.assertEqual("Warrior", record.name[0])
+
+        record = next(iter(CharClassDBC(get_dbc_path('ChrClasses'), locale=2)))
+        self.assertEqual(record.name[2], record.name.text)
+
+
+class DBCRecordTests(TestCase):
+    def test_record_type_is_compiled_from_skeleton(self):
+        record = next(iter(SpellDurationDBC(get_dbc_path('SpellDuration'))))
+
+        self.assertIsInstance(record, DBCRecord)
+        self.assertEqual(('ID', 'BaseDuration', 'PerLevel', 'MaxDuration'), record._fields)
+        self.assertFalse(hasattr(record, '__dict__'))
+        self.assertEqual(record.ID, record[0])
+
+    def test_asdict(self):
+        record = next(iter(ItemSetDBC(get_dbc_path('ItemSet'))))
+        data = record._asdict()
+
+        self.assertEqual(record.ID, data['ID'])
+        self.assertEqual(record.Items, data['Items'])
+        self.assertEqual(record.DisplayName.text, data['DisplayName'].text)
+
+
+class SnapshotTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.source = os.path.join(self.directory, 'Source.dbc')
+        self.path = os.path.join(self.directory, 'snapshots', 'Source.snapshot')
+        with open(self.source, 'wb') as f:
+            f.write(b'WDBC')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        write_snapshot(self.path, self.source, ('skeleton', 1), {'a': [1, 2]})
+        self.assertEqual({'a': [1, 2]}, read_snapshot(self.path, self.source, ('skeleton', 1)))
+
+    def test_missing(self):
+        self.assertRaises(StaleSnapshot, read_snapshot, self.path, self.source, 1)
+
+    def test_version_change(self):
+        write_snapshot(self.path, self.source, ('skeleton', 1), {})
+        self.assertRaises(StaleSnapshot, read_snapshot, self.path, self.source, ('skeleton', 2))
+
+    def test_source_change(self):
+        write_snapshot(self.path, self.source, 1, {})
+        with open(self.source, 'wb') as f:
+            f.write(b'WDBC2')
+        self.assertRaises(StaleSnapshot, read_snapshot, self.path, self.source, 1)
+
+    def test_touched_source_with_same_contents(self):
+        write_snapshot(self.path, self.source, 1, {})
+        st = os.stat(self.source)
+        os.utime(self.source, (st.st_atime + 10, st.st_mtime + 10))
+        self.assertEqual({}, read_snapshot(self.path, self.source, 1))
+
+    def test_touched_source_is_not_hashed_again(self):
+        write_snapshot(self.path, self.source, 1, {})
+        st = os.stat(self.source)
+        os.utime(self.source, (st.st_atime + 10, st.st_mtime + 10))
+        read_snapshot(self.path, self.source, 1)
+
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        header_length, = struct.unpack_from('<I', data, len(SNAPSHOT_MAGIC))
+        header = pickle.loads(data[len(SNAPSHOT_MAGIC) + 4:][:header_length])
+        self.assertEqual(os.stat(self.source).st_mtime_ns, header['source']['mtime'])
+        self.assertEqual({}, read_snapshot(self.path, self.source, 1))
+
+    def test_keyed_touched_source(self):
+        write_keyed_snapshot(self.path, [self.source], 1, [(1, b'one')])
+        st = os.stat(self.source)
+        os.utime(self.source, (st.st_atime + 10, st.st_mtime + 10))
+        self.assertEqual(b'one', KeyedSnapshot(self.path, [self.source], 1).get(1))
+        self.assertEqual(b'one', KeyedSnapshot(self.path, [self.source], 1).get(1))
+
+    def test_permissions_follow_umask(self):
+        write_snapshot(self.path, self.source, 1, {})
+        self.assertEqual(0o666 & ~_umask, stat.S_IMODE(os.stat(self.path).st_mode))
+
+    def test_corrupt(self):
+        write_snapshot(self.path, self.source, 1, {})
+        with open(self.path, 'r+b') as f:
+            f.truncate(20)
+        self.assertRaises(StaleSnapshot, read_snapshot, self.path, self.source, 1)
+
+    def test_header_not_a_dict(self):
+        header = pickle.dumps([1, 2])
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, 'wb') as f:
+            f.write(SNAPSHOT_MAGIC + struct.pack('<I', len(header)) + header + pickle.dumps({}))
+        self.assertRaises(StaleSnapshot, read_snapshot, self.path, self.source, 1)
+
+    def test_keyed_round_trip(self):
+        write_keyed_snapshot(self.path, [self.source], 1, [(30, b'thirty'), (2, b''), (7, b'seven')])
+        snapshot = KeyedSnapshot(self.path, [self.source], 1)
+        self.assertEqual(b'seven', snapshot.get(7))
+        self.assertEqual(b'', snapshot.get(2))
+        self.assertIsNone(snapshot.get(8))
+        self.assertEqual([2, 7, 30], list(snapshot))
+        self.assertIn(30, snapshot)
+
+    def test_keyed_stale(self):
+        write_keyed_snapshot(self.path, [self.source], 1, [(1, b'one')])
+        self.assertRaises(StaleSnapshot, KeyedSnapshot, self.path, [self.source], 2)
+        with open(self.source, 'wb') as f:
+            f.write(b'WDBC2')
+        self.assertRaises(StaleSnapshot, KeyedSnapshot, self.path, [self.source], 1)
+
+
+class SyntheticDBCTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'ItemSet.dbc')
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_round_trip(self):
+        write_synthetic_dbc(ItemSetDBC, self.path, 100)
+        dbc = ItemSetDBC(self.path)
+        columns = dbc.read_columns()
+        records = list(dbc)
+
+        self.assertEqual(100, len(columns))
+        self.assertEqual(list(range(1, 101)), list(columns['ID']))
+        self.assertEqual([record.ID for record in records], list(columns['ID']))
+        self.assertTrue(all(record.DisplayName for record in records))
+
+    def test_item_in_several_item_sets(self):
+        write_synthetic_dbc(ItemSetDBC, self.path, 100)
+        item_sets = ItemSet.build_data(ItemSetDBC(self.path))
+        set_ids = {}
+        for set_id in sorted(item_sets['item_set']):
+            for item_id in set(item_sets['item_set'][set_id]['items']):
+                set_ids.setdefault(item_id, []).append(set_id)
+        item_id = next(item_id for item_id in sorted(set_ids) if len(set_ids[item_id]) > 1)
+        self.assertEqual(tuple(set_ids[item_id]), item_sets['item_set_ids'].get(item_id))
+
+
+class LoadDBCDataTests(TestCase):
+    def test_worker_data_buffer(self):
+        data = pickle.loads(_read_loader_data('SpellDuration'))
+        self.assertEqual(SpellDuration.duration_data_dict, data['duration_data_dict'])
+
+
+class LazyLoadingTests(TestCase):
+    def test_loads_on_first_access(self):
+        if 'radius_data_dict' in SpellRadius.__dict__:
+            del SpellRadius.radius_data_dict
+        SpellRadius._loaded = False
+
+        self.assertEqual(5.0, SpellRadius.get_max_radius(8))
+        self.assertTrue(SpellRadius._loaded)
+
+    def test_unknown_attribute_does_not_load(self):
+        if 'radius_data_dict' in SpellRadius.__dict__:
+            del SpellRadius.radius_data_dict
+        SpellRadius._loaded = False
+
+        self.assertFalse(hasattr(SpellRadius, 'not_a_table'))
+        self.assertFalse(SpellRadius._loaded)
+        self.assertRaises(AttributeError, getattr, SpellRadius, 'not_a_table')
+
+
+class IntTableTests(TestCase):
+    def test_dense(self):
+        table = IntTable([3, 1, 2], [30, 10, 20])
+        self.assertEqual(20, table[2])
+        self.assertEqual(3, len(table))
+        self.assertEqual([1, 2, 3], list(table))
+        self.assertIsNone(table.sorted_keys)
+
+    def test_sparse(self):
+        table = IntTable([5, 1000000, 3], [1, 2, 3])
+        self.assertEqual(2, table[1000000])
+        self.assertIsNotNone(table.sorted_keys)
+
+    def test_missing(self):
+        for table in (IntTable([1, 2], [1, 2]), IntTable([1, 1000000], [1, 2])):
+            self.assertRaises(KeyError, table.__getitem__, 3)
+            self.assertEqual('default', table.get(0, 'default'))
+            self.assertIsNone(table.get(None))
+            self.assertNotIn(-5, table)
+
+    def test_multiple_columns(self):
+        table = IntTable([1, 2], [10, 20], [-1, -2])
+        self.assertEqual((20, -2), table[2])
+
+    def test_last_repeated_key_wins(self):
+        self.assertEqual(2, IntTable([1, 1], [1, 2])[1])
+
+
+class IntMultiTableTests(TestCase):
+    def setUp(self):
+        self.table = IntMultiTable([(5, 1), (3, 2), (5, 9), (5, 1), (-2, 7)])
+
+    def test_get(self):
+        self.assertEqual((1, 9), self.table[5])
+        self.assertEqual((7,), self.table.get(-2))
+        self.assertEqual((), self.table.get(4))
+        self.assertRaises(KeyError, lambda: self.table[4])
+
+    def test_keys(self):
+        self.assertEqual([-2, 3, 5], list(self.table))
+        self.assertEqual(3, len(self.table))
+        self.assertIn(3, self.table)
+        self.assertNotIn('3', self.table)
+
+
+class ColumnStoreTests(TestCase):
+    def setUp(self):
+        self.store = ColumnStore(
+            [7, 3],
+            {'Scalar': [array('i', [70, 30])],
+             'Wide': [array('i', [1, 4]), array('i', [2, 5]), array('i', [3, 6])],
+             'Float': [array('f', [0.5, 1.5])]},
+            {'Name': ['Seven', 'Three'], 'Rank': ['Rank 1', 'Rank 1']})
+
+    def test_get(self):
+        self.assertEqual(30, self.store.get(3, 'Scalar'))
+        self.assertEqual([4, 5, 6], self.store.get(3, 'Wide'))
+        self.assertEqual(0.5, self.store.get(7, 'Float'))
+        self.assertEqual('Seven', self.store.get(7, 'Name'))
+        self.assertRaises(KeyError, self.store.get, 5, 'Scalar')
+
+    def test_strings_are_pooled(self):
+        self.assertEqual(['Seven', 'Three', 'Rank 1'], self.store.strings)
+        self.assertIs(self.store.get(3, 'Rank'), self.store.get(7, 'Rank'))
+
+    def test_rows(self):
+        self.assertEqual([3, 7], list(self.store))
+        self.assertEqual(2, len(self.store))
+        self.assertIn(7, self.store)
+        self.assertNotIn(5, self.store)
+
+
+class DescriptionProgramTests(TestCase):
+    def render(self, description):
+        return render(
+            compile_description(description), 1,
+            lambda spell_id, reference: str(spell_id * 10 + reference.index + 1),
+            lambda spell_id: 5000,
+            lambda code, round_digits: '<%s>' % code)
+
+    def test_tokens(self):
+        program = compile_description('Deals $s1.$?s5[][ More.]')
+        self.assertEqual([LITERAL, REFERENCE, LITERAL, CONDITION], [token[0] for token in program])
+        self.assertEqual(('s', 0), (program[1][1].type, program[1][1].index))
+
+    def test_programs_are_cached(self):
+        self.assertIs(compile_description('Deals $s1.'), compile_description('Deals $s1.'))
+
+    def test_render(self):
+        self.assertEqual('Deals 11 for 5000 ms, he or she', self.render('Deals $s1 for $<duration> ms, $Ghe:she;'))
+        self.assertEqual('Base 12', self.render('$?s5[Talent][Base $s2]'))
+        self.assertEqual('<12*2>', self.render('${$s2*2}'))
+
+    def test_pluralize(self):
+        self.assertEqual('1 sec or 12 secs', self.render('1 $lsec:secs; or $s2 $lsec:secs;'))
+        self.assertEqual('no $lsec:secs;', self.render('no $lsec:secs;'))
+
+
+class EvaluateExpressionTests(TestCase):
+    def test_arithmetic(self):
+        self.assertEqual(2.5, evaluate_expression('10/4'))
+        self.assertEqual(-14, evaluate_expression('-(3+4)*2'))
+        self.assertEqual(4.5, evaluate_expression('1.5*3'))
+
+    def test_rejects_anything_else(self):
+        for expression in ('__import__("os")', 'x', '2**3', '[1]', '"a"'):
+            self.assertRaises(ValueError, evaluate_expression, expression)
+        self.assertRaises(SyntaxError, evaluate_expression, '4869 to 7919*2')
+
+
 class DateDiffTests(TestCase):
     def test_seconds(self):
         self.assertEqual(date_diff(1), '1 second')
@@ -40,6 +380,13 @@ class CharTitleTests(TestCase):
         self.assertEqual(CharTitle.get_clean_name(110, 0), "Jenkins")
 
 
+class GemPropertiesTests(TestCase):
+    def test_get_gem_properties_ids(self):
+        # Delicate scarlet ruby
+        self.assertEqual((1216,), GemProperties.get_gem_properties_ids(3447))
+        self.assertEqual((), GemProperties.get_gem_properties_ids(1))
+
+
 class ItemClassTests(TestCase):
     def test_get_display_name(self):
         self.assertEqual('Armor', ItemClass.get_display_name(4))
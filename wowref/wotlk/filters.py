@@ -0,0 +1,226 @@
+"""Faceted filtering of items from in memory bitsets.
+
+Every item gets a position, best quality first and then highest item level,
+and every value of a facet has a bitset of the positions of the items with
+that value.  The bitsets are Python ints, so a filter is a few bitwise ands
+and ors of them, and the number of items with a value is the number of bits
+set in the and of its bitset and the filter.
+
+The facets are:
+
+    class             The item class, such as Armor.
+    sub_class         A (class, sub class) pair, such as (4, 1) for Cloth.
+    inv_type          The inventory type, such as Head.
+    quality           The quality, such as Epic.
+    allowable_class   The player classes that can use the item.
+    stat_type         The stats the item has, see iter_stats.
+
+Items can also be filtered by a range of their required level.
+"""
+from array import array
+import sys
+
+from .indexes import rank_rows, RankedItems, SnapshotIndex
+from .item_constants import (
+    get_class, get_inventory_type, get_player_class, get_quality, get_stat_name, get_sub_class,
+    iter_allowed_classes
+)
+from .models import ITEM_TEMPLATE_PROFILES, ItemTemplate
+from .ranking import iter_stats
+
+FILTER_INDEX_VERSION = 3
+
+FACETS = ('class', 'sub_class', 'inv_type', 'quality', 'allowable_class', 'stat_type')
+
+_facet_labels = {
+    'class': get_class,
+    'sub_class': lambda value: get_sub_class(*value),
+    'inv_type': get_inventory_type,
+    'quality': get_quality,
+    'allowable_class': get_player_class,
+    'stat_type': get_stat_name,
+}
+
+# int.bit_count is only there from Python 3.10 on.
+_popcount = getattr(int, 'bit_count', None) or (lambda bits: bin(bits).count('1'))
+
+
+def _bitset(positions, size):
+    """An int with the bits of positions set."""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bytes(bits), 'little')
+
+
+class ItemFilterIndex(object):
+    """Bitsets of the items with each value of each facet.
+
+    Args:
+        rows: Tuples of the columns of the 'filter' ITEM_TEMPLATE_PROFILES
+            entry, one per item.
+
+    """
+    def __init__(self, rows):
+        columns = ITEM_TEMPLATE_PROFILES['filter']
+        rows = rank_rows(dict(zip(columns, row)) for row in rows)
+        self.items = RankedItems(rows)
+        self.size = len(rows)
+        self.all = (1 << self.size) - 1
+
+        positions = dict((facet, {}) for facet in FACETS)
+        for position, row in enumerate(rows):
+            values = {
+                'class': [row['class_field']],
+                'sub_class': [(row['class_field'], row['sub_class'])],
+                'inv_type': [row['inv_type_id']],
+                'quality': [row['quality']],
+                'allowable_class': [
+                    class_id for class_id, _ in iter_allowed_classes(row['allowable_class'])
+                ],
+                'stat_type': set(stat_type for stat_type, _ in iter_stats(row)),
+            }
+            for facet in FACETS:
+                for value in values[facet]:
+                    positions[facet].setdefault(value, []).append(position)
+
+        self.facets = dict(
+            (facet, dict((value, _bitset(value_positions, self.size))
+                         for value, value_positions in positions[facet].items()))
+            for facet in FACETS
+        )
+
+        # levels_at_most[level] has the items that require at most level.
+        by_level = {}
+        for position, level in enumerate(self.items.required_levels):
+            by_level.setdefault(level, []).append(position)
+        self.levels_at_most = []
+        bits = 0
+        for level in range(max(by_level or [0]) + 1):
+            bits |= _bitset(by_level.get(level, ()), self.size)
+            self.levels_at_most.append(bits)
+
+    @classmethod
+    def from_database(cls):
+        """Builds the facet bitsets of every item template."""
+        return cls(ItemTemplate.objects.profile_values_list('filter'))
+
+    def __len__(self):
+        return self.size
+
+    def _level_bits(self, min_level=None, max_level=None):
+        """The bitset of the items requiring a level from min_level to max_level."""
+        bits = self.all
+        if max_level is not None:
+            if max_level < 0:
+                return 0
+            bits = self.levels_at_most[min(max_level, len(self.levels_at_most) - 1)]
+        if min_level is not None and min_level > 0:
+            bits &= ~self.levels_at_most[min(min_level, len(self.levels_at_most)) - 1]
+        return bits
+
+    def match(self, criteria, exclude=None):
+        """The bitset of the items matching criteria.
+
+        Args:
+            criteria: A dict of facet name to the values to accept, an item
+                matches when it has any of them.  'required_level' is a
+                (min_level, max_level) pair instead, either can be None.
+            exclude: The name of a facet to leave out of criteria.
+
+        Raises:
+            KeyError: If criteria has a name that is not a facet.
+
+        """
+        bits = self.all
+        for name, values in criteria.items():
+            if name == exclude:
+                continue
+            if name == 'required_level':
+                bits &= self._level_bits(*values)
+                continue
+            facet = self.facets[name]
+            any_bits = 0
+            for value in values:
+                any_bits |= facet.get(value, 0)
+            bits &= any_bits
+        return bits
+
+    def count(self, bits):
+        """The number of items in bits."""
+        return _popcount(bits)
+
+    def facet_counts(self, criteria, facets=FACETS):
+        """The number of items with each value of each facet.
+
+        The counts of a facet ignore the criteria of that facet, so they are
+        the number of items that would be found when adding that value.
+
+        Return:
+            A dict of facet name to a list of dicts with the value, its label
+            and the count, for the values with a count, most items first.
+
+        """
+        counts = {}
+        for name in facets:
+            bits = self.match(criteria, exclude=name)
+            label = _facet_labels[name]
+            values = []
+            for value, value_bits in self.facets[name].items():
+                count = _popcount(bits & value_bits)
+                if count:
+                    values.append({'value': value, 'label': label(value), 'count': count})
+            values.sort(key=lambda value: -value['count'])
+            counts[name] = values
+        return counts
+
+    def positions(self, bits, offset=0, limit=None):
+        """The positions of the items in bits, in order."""
+        words = array('Q', bits.to_bytes((bits.bit_length() + 63) // 64 * 8, 'little'))
+        if sys.byteorder != 'little':
+            words.byteswap()
+
+        found = []
+        for i, word in enumerate(words):
+            if not word:
+                continue
+            # Skip whole words while the offset is not reached.
+            if offset:
+                count = _popcount(word)
+                if count <= offset:
+                    offset -= count
+                    continue
+            while word:
+                low = word & -word
+                word ^= low
+                if offset:
+                    offset -= 1
+                    continue
+                if limit is not None and len(found) >= limit:
+                    return found
+                found.append(i * 64 + low.bit_length() - 1)
+        return found
+
+    def query(self, criteria, offset=0, limit=50, facets=FACETS):
+        """The items matching criteria, with the counts of the facets.
+
+        Return:
+            A dict with the total number of matching items, a page of the
+            items with their id, name, quality, item_level and
+            required_level, and the facet_counts.
+
+        """
+        bits = self.match(criteria)
+        return {
+            'total': _popcount(bits),
+            'items': [self.items.get(position) for position in self.positions(bits, offset, limit)],
+            'facets': self.facet_counts(criteria, facets),
+        }
+
+
+filter_index = SnapshotIndex(ItemFilterIndex, 'ItemFilterIndex', FILTER_INDEX_VERSION)
+
+
+def filter_items(criteria, offset=0, limit=50):
+    """See ItemFilterIndex.query."""
+    return filter_index.get().query(criteria, offset, limit)
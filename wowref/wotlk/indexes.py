@@ -0,0 +1,107 @@
+"""The parts shared by the in memory indexes of the item templates.
+
+These are the name index of wotlk.search, the filter index of wotlk.filters,
+the stat index of wotlk.ranking and the reference index of wotlk.references,
+each kept by a SnapshotIndex.  Most of them number the items by rank, best
+quality first and then highest item level, and keep the columns they return
+of each item in a RankedItems.
+"""
+from array import array
+
+from django.conf import settings
+
+from .dbc import get_snapshot_path
+from .dbc.snapshots import read_snapshot, write_snapshot, StaleSnapshot
+
+
+def rank_rows(rows):
+    """Sorts dicts of item template columns by rank.
+
+    Items are ranked by quality and then item level, best first.  Items with
+    the same quality and item level are sorted by name and entry, so the
+    ranks do not depend on the order of the rows.
+    """
+    return sorted(rows, key=lambda row: (-row['quality'], -row['item_level'], row['name'], row['entry']))
+
+
+class RankedItems(object):
+    """The columns of each item that an index returns, by rank.
+
+    Args:
+        rows: Dicts with the entry, name, quality, item_level and
+            required_level of each item, sorted by rank_rows.
+
+    """
+    def __init__(self, rows):
+        self.entries = array('i', [row['entry'] for row in rows])
+        self.names = [row['name'] for row in rows]
+        self.qualities = array('b', [row['quality'] for row in rows])
+        self.item_levels = array('h', [row['item_level'] for row in rows])
+        self.required_levels = array('h', [row['required_level'] for row in rows])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, position):
+        """A dict of the id, name, quality, item_level and required_level of an item."""
+        return {
+            'id': self.entries[position],
+            'name': self.names[position],
+            'quality': self.qualities[position],
+            'item_level': self.item_levels[position],
+            'required_level': self.required_levels[position],
+        }
+
+
+class SnapshotIndex(object):
+    """An index of the item templates that is kept in a snapshot.
+
+    The index is read from the snapshot that build_search_index writes, or
+    built from the database the first time it is used when there is none.
+    The snapshot is only used while both its version and the
+    TOOLTIP_DATA_VERSION setting match, so bump the version when the layout
+    of index_class changes, and the setting after the item database changes.
+
+    Args:
+        index_class: The class of the index.  Its from_database classmethod
+            builds it from the item_template table in a single query.
+        name: The name of the snapshot.
+        version: The version of the layout of index_class.
+
+    """
+    def __init__(self, index_class, name, version):
+        self.index_class = index_class
+        self.name = name
+        self.version = version
+        self._index = None
+
+    def get_path(self):
+        return get_snapshot_path(self.name)
+
+    def get_version(self):
+        return (self.version, getattr(settings, 'TOOLTIP_DATA_VERSION', 1))
+
+    def build(self, path=None):
+        """Builds the index from the database and writes it to a snapshot.
+
+        Return:
+            The number of items in the index.
+
+        """
+        self._index = self.index_class.from_database()
+        write_snapshot(path or self.get_path(), None, self.get_version(), self._index)
+        return len(self._index)
+
+    def rebuild(self):
+        """Rebuilds the index of this process from the database."""
+        self._index = self.index_class.from_database()
+        return self._index
+
+    def get(self):
+        """The index, read from its snapshot or built the first time it is used."""
+        if self._index is None:
+            try:
+                self._index = read_snapshot(self.get_path(), None, self.get_version())
+            except StaleSnapshot:
+                self._index = self.index_class.from_database()
+        return self._index
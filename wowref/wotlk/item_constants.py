@@ -53,6 +53,17 @@ _triggers = [
     'Learn'
 ]
 
+_qualities = [
+    "Poor",
+    "Common",
+    "Uncommon",
+    "Rare",
+    "Epic",
+    "Legendary",
+    "Artifact",
+    "Heirloom"
+]
+
 _classes = [
     (1, "Warrior"),
     (2, "Paladin"),
@@ -73,6 +84,19 @@ def iter_allowed_classes(allowed_classes):
             yield class_id, class_name
 
 
+def get_player_class(class_id):
+    """The name of the player class with class_id, or None."""
+    return dict(_classes).get(class_id)
+
+
+def get_quality(quality):
+    """The name of an item quality, such as Epic."""
+    try:
+        return _qualities[quality]
+    except IndexError:
+        return None
+
+
 def get_bonding(bonding):
     return _bondings[bonding]
 
@@ -263,3 +287,11 @@ def format_item_stat(stat_type, stat_value, with_sign=False):
         return _int_to_str[stat_type] % ('+' if stat_value > 0 else '-', stat_value)
     else:
         return _int_to_str[stat_type] % int(stat_value)
+
+
+def get_stat_name(stat_type):
+    """The short name of a stat type, such as Spell Power, or None."""
+    try:
+        return ItemMod[ItemMod(_int_to_str[stat_type]).name + '_SHORT'].value
+    except KeyError:
+        return None
@@ -6,17 +6,176 @@ from .item_constants import (
     get_trigger, iter_allowed_classes, get_enchant_description, get_gem_item_id,
     does_gem_match_socket
 )
-from .models import ItemTemplate
+from .cache import item_template_cache
+from .models import CharacterInventory, ItemInstance, ItemTemplate
 from .dbc import ItemSet, Spell, ItemDisplayInfo, GemProperties
 
 
+def get_related_item_ids(item_id, enchant_ids=(), item_set_id=None):
+    """The ids of the items a tooltip of item_id needs.
+
+    That is the item itself, the other pieces of its item set and the gems
+    of the enchant ids an item instance has.
+
+    Args:
+        item_id: The entry of the item template.
+        enchant_ids: The enchant ids of the item instance.
+        item_set_id: The item_set column of the template, 0 for none.  When
+            it is None, the pieces of every item set of the ItemSet DBC
+            listing item_id are included.
+
+    """
+    item_id = int(item_id)
+    item_ids = {item_id}
+
+    if item_set_id is None:
+        item_set_ids = ItemSet.get_item_set_ids(item_id)
+    else:
+        item_set_ids = (item_set_id,) if item_set_id else ()
+    for set_id in item_set_ids:
+        item_set = ItemSet.get_item_set(set_id)
+        if item_set:
+            item_ids.update(item_set['items'])
+
+    for enchant_id in enchant_ids:
+        gem_item_id = enchant_id and get_gem_item_id(enchant_id)
+        if gem_item_id:
+            item_ids.add(gem_item_id)
+    return item_ids
+
+
+def load_items(item_ids, profile='tooltip'):
+    """Builds an Item for each of item_ids from at most a single query.
+
+    The templates are read through the item template cache, only the ones
+    it is missing are queried.  The Items share the templates, so when the
+    gems or set pieces of an item are among item_ids they are not looked up
+    again.
+
+    Args:
+        item_ids: The ids of the items.
+        profile: The ITEM_TEMPLATE_PROFILES entry of the columns to load.
+
+    Return:
+        A dict of item id to Item.  Ids that have no template are left out.
+
+    """
+    templates = item_template_cache.get_many(item_ids, profile)
+    return dict((item_id, Item(item_id, templates=templates, profile=profile)) for item_id in templates)
+
+
+def load_item(item_id, item_instance=None):
+    """Builds an Item together with its set pieces and gems in a single query.
+
+    Args:
+        item_id: The entry of the item template.
+        item_instance: The ItemInstance of the item, whose enchants and gems
+            are rendered, or None.
+
+    """
+    item_id = int(item_id)
+    enchant_ids = item_instance.get_enchantment_ids() if item_instance is not None else ()
+    templates = item_template_cache.get_many(get_related_item_ids(item_id, enchant_ids))
+    if item_id not in templates:
+        raise ItemTemplate.DoesNotExist('No item template with entry %i' % item_id)
+    return Item(item_id, templates=templates, item_instance=item_instance)
+
+
+def load_tooltip_items(item_ids):
+    """Builds the Items of item_ids with their set pieces in a single query.
+
+    Return:
+        A dict of item id to Item, for the ids of item_ids that have a
+        template.
+
+    """
+    item_ids = set(int(item_id) for item_id in item_ids)
+    related_ids = set()
+    for item_id in item_ids:
+        related_ids.update(get_related_item_ids(item_id))
+    items = load_items(related_ids)
+    return dict((item_id, items[item_id]) for item_id in item_ids if item_id in items)
+
+
+def load_character_equipment(character_id):
+    """Builds an Item for every item a character has equipped.
+
+    The item instances are read in a single query.  Their enchantments are
+    parsed together, and the templates of every item, its set pieces and
+    its gems are read through the item template cache at once.  The enchant
+    descriptions come from the SpellItemEnchantment DBC, so rendering the
+    enchants and gems queries nothing else.
+
+    Args:
+        character_id: The guid of the character.
+
+    Return:
+        A dict of equipment slot, 0 through 18, to Item.  Empty slots and
+        items without a template are left out.
+
+    """
+    inventory = list(
+        CharacterInventory.objects
+        .filter(character=character_id, bag=CharacterInventory.EQUIPMENT_BAG,
+                slot__lt=CharacterInventory.EQUIPMENT_SLOTS)
+        .select_related('item')
+    )
+
+    item_ids = set()
+    for row in inventory:
+        item_ids.update(get_related_item_ids(row.item.item_entry, row.item.get_enchantment_ids()))
+    templates = item_template_cache.get_many(item_ids)
+
+    return dict(
+        (row.slot, Item(row.item.item_entry, templates=templates, item_instance=row.item))
+        for row in inventory if row.item.item_entry in templates
+    )
+
+
 class Item(object):
-    def __init__(self, item_id):
+    # The properties that make up a tooltip, see to_dict.
+    tooltip_fields = (
+        'name', 'quality', 'item_level', 'required_level', 'bonding', 'inv_type_name',
+        'class_name', 'sub_class_name', 'armor', 'min_damage', 'max_damage', 'speed', 'dps',
+        'primary_stats', 'arcane_res', 'fire_res', 'frost_res', 'nature_res', 'shadow_res',
+        'secondary_stats', 'spells', 'enchant', 'sockets', 'socket_bonus', 'description',
+        'item_set', 'required_classes', 'icon_urls'
+    )
+
+    def __init__(self, item_id, templates=None, profile='tooltip', item_instance=None):
+        """Wraps the item template with entry item_id.
+
+        Args:
+            item_id: The entry of the item template.
+            templates: Templates fetched together with this one, keyed by
+                entry.  It is shared with the gems of this item and any Item
+                loaded alongside it.
+            profile: The ITEM_TEMPLATE_PROFILES entry of the columns to load
+                when the template is not in templates or the cache.
+            item_instance: The ItemInstance this item is, for its enchant and
+                gems.  None for a plain item template.
+
+        """
         self.item_id = item_id
-        self._item_template = ItemTemplate.objects.get(pk=self.item_id)
+        self._templates = templates if templates is not None else {}
+        try:
+            self._item_template = self._templates[int(item_id)]
+        except (KeyError, TypeError):
+            self._item_template = item_template_cache.get_template(item_id, profile)
         self._gems = []
 
-        self._item_instance = None
+        self._item_instance = item_instance
+
+    @classmethod
+    def from_item_instance_id(cls, item_instance_id):
+        """The Item of the ItemInstance with guid item_instance_id.
+
+        Raises:
+            ItemInstance.DoesNotExist: If there is no such item instance.
+
+        """
+        item_instance = ItemInstance.objects.get(pk=item_instance_id)
+        return load_item(item_instance.item_entry, item_instance)
 
     @cached_property
     def name(self):
@@ -282,11 +441,7 @@ class Item(object):
         """
         if not self._item_instance:
             return None
-
-        enchantments = self._item_instance.enchantments.split(' ')
-        # Only every 3rd enchant is good, and the last enchant is empty string.
-        enchantments = [int(enchant) for enchant in enchantments[:-1:3]]
-        return enchantments
+        return self._item_instance.get_enchantment_ids()
 
     @property
     def enchant(self):
@@ -328,7 +483,17 @@ class Item(object):
 
         item_set = ItemSet.get_item_set(item_set_id)
 
-        items = list(ItemTemplate.objects.filter(pk__in=item_set['items']).values('name'))
+        names = dict(
+            (item_id, self._templates[item_id].name)
+            for item_id in item_set['items'] if item_id in self._templates
+        )
+        missing = [item_id for item_id in item_set['items'] if item_id not in names]
+        if missing:
+            names.update(
+                (item_id, template.name)
+                for item_id, template in item_template_cache.get_many(missing, 'set_listing').items()
+            )
+        items = [{'name': names[item_id]} for item_id in sorted(names)]
 
         bonuses = []
         a = bonuses.append
@@ -370,7 +535,7 @@ class Item(object):
                 a(None)
                 continue
 
-            gem = Gem(enchant_id)
+            gem = Gem(enchant_id, templates=self._templates)
             a(gem)
         return gems
 
@@ -476,6 +641,12 @@ class Item(object):
 
         return sockets or None
 
+    def to_dict(self):
+        """The tooltip of the item as a dict that can be serialized to JSON."""
+        tooltip = dict((name, getattr(self, name)) for name in self.tooltip_fields)
+        tooltip['id'] = int(self.item_id)
+        return tooltip
+
     def has_flag(self, flag):
         return bool((1 << (flag - 1)) & self._item_template.flags)
 
@@ -489,10 +660,10 @@ class Item(object):
 
 
 class Gem(object):
-    def __init__(self, enchant_id):
+    def __init__(self, enchant_id, templates=None):
         self.enchant_id = enchant_id
         self.item_id = get_gem_item_id(self.enchant_id)
-        self.item = Item(item_id=self.item_id)
+        self.item = Item(item_id=self.item_id, templates=templates, profile='gem')
         self.gem_properties_id = self.item.gem_properties_id
 
     @property
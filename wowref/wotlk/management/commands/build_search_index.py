@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from wotlk.filters import filter_index
+from wotlk.ranking import stat_index
+from wotlk.references import reference_index
+from wotlk.search import name_index
+
+
+class Command(BaseCommand):
+    help = 'Builds the item name, filter, stat and reference indexes into snapshots read at startup.'
+
+    def handle(self, *args, **options):
+        count = name_index.build()
+        self.stdout.write('Indexed the names of %i items.' % count)
+        count = filter_index.build()
+        self.stdout.write('Indexed the facets of %i items.' % count)
+        count = stat_index.build()
+        self.stdout.write('Indexed the stats of %i items.' % count)
+        count = reference_index.build()
+        self.stdout.write('Indexed the spells, sets and gems of %i items.' % count)
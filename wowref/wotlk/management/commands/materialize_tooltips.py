@@ -0,0 +1,20 @@
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from wotlk.tooltips import materialize_tooltips
+
+
+class Command(BaseCommand):
+    help = 'Renders the tooltip of every item into a snapshot that ItemDetailView serves.'
+
+    option_list = BaseCommand.option_list + (
+        make_option('--processes', type='int', default=None,
+                    help='The number of worker processes, defaults to the number of CPUs.'),
+        make_option('--chunk-size', type='int', default=500, dest='chunk_size',
+                    help='The number of items rendered by a worker at once.'),
+    )
+
+    def handle(self, *args, **options):
+        stored = materialize_tooltips(processes=options['processes'], chunk_size=options['chunk_size'])
+        self.stdout.write('Materialized %i item tooltips.' % stored)
@@ -1,6 +1,51 @@
 from django.db import models
 
 
+def _numbered(*names, count):
+    """The names formatted with each number from 1 through count."""
+    return tuple(name % i for i in range(1, count + 1) for name in names)
+
+
+# The columns each way of rendering an item reads, everything else is left
+# in the database.
+ITEM_TEMPLATE_PROFILES = {
+    'tooltip': (
+        'entry', 'class_field', 'sub_class', 'name', 'display_id', 'quality', 'flags',
+        'inv_type_id', 'allowable_class', 'item_level', 'required_level', 'stats_count',
+        'dmg_min1', 'dmg_max1', 'armor', 'fire_res', 'nature_res', 'frost_res', 'shadow_res',
+        'arcane_res', 'delay', 'bonding', 'description', 'item_set', 'socket_bonus',
+        'gem_properties',
+    ) + _numbered('stat_type%i', 'stat_value%i', count=10)
+      + _numbered('spell_id_%i', 'spell_trigger_%i', count=5)
+      + _numbered('socket_color_%i', count=3),
+    'set_listing': ('entry', 'name'),
+    'gem': ('entry', 'name', 'display_id', 'gem_properties'),
+    'search_result': (
+        'entry', 'name', 'display_id', 'quality', 'item_level', 'required_level',
+        'class_field', 'sub_class', 'inv_type_id',
+    ),
+    'name_index': ('entry', 'name', 'quality', 'item_level', 'required_level'),
+    'filter': (
+        'entry', 'name', 'quality', 'item_level', 'required_level', 'class_field', 'sub_class',
+        'inv_type_id', 'allowable_class',
+    ) + _numbered('stat_type%i', 'stat_value%i', count=10),
+    'stats': (
+        'entry', 'name', 'quality', 'item_level', 'required_level', 'inv_type_id',
+    ) + _numbered('stat_type%i', 'stat_value%i', count=10),
+    'references': ('entry', 'gem_properties') + _numbered('spell_id_%i', count=5),
+}
+
+
+class ItemTemplateManager(models.Manager):
+    def profile(self, name):
+        """A queryset that only loads the columns of the named profile."""
+        return self.get_queryset().only(*ITEM_TEMPLATE_PROFILES[name])
+
+    def profile_values_list(self, name):
+        """A values_list queryset of the columns of the named profile."""
+        return self.get_queryset().values_list(*ITEM_TEMPLATE_PROFILES[name])
+
+
 class ItemTemplate(models.Model):
     entry = models.AutoField(primary_key=True)
     class_field = models.IntegerField(db_column='class')
@@ -140,9 +185,136 @@ class ItemTemplate(models.Model):
     max_money_loot = models.IntegerField(db_column='maxMoneyLoot')
     wdb_verified = models.IntegerField(null=True, db_column='WDBVerified', blank=True)
 
+    objects = ItemTemplateManager()
+
     def __getitem__(self, key):
-        return self.__dict__[key]
+        return getattr(self, key)
 
     class Meta:
         managed = False
         db_table = 'item_template'
+
+
+class Character(models.Model):
+    guid = models.IntegerField(primary_key=True)
+    account = models.IntegerField(default=0)
+    name = models.CharField(max_length=12, default='')
+    race_id = models.IntegerField(db_column='race', default=0)
+    class_id = models.IntegerField(db_column='class', default=0)
+    gender_id = models.IntegerField(db_column='gender', default=0)
+    level = models.IntegerField(default=0)
+    xp = models.IntegerField(default=0)
+    money = models.IntegerField(default=0)
+    player_bytes = models.IntegerField(db_column='playerBytes', default=0)
+    player_bytes2 = models.IntegerField(db_column='playerBytes2', default=0)
+    player_flags = models.IntegerField(db_column='playerFlags', default=0)
+    position_x = models.FloatField(default=0)
+    position_y = models.FloatField(default=0)
+    position_z = models.FloatField(default=0)
+    map = models.IntegerField(default=0)
+    instance_id = models.IntegerField(default=0)
+    instance_mode_mask = models.IntegerField(default=0)
+    orientation = models.FloatField(default=0)
+    taximask = models.TextField(default='')
+    online = models.BooleanField(default=False)
+    cinematic = models.IntegerField(default=0)
+    total_time = models.IntegerField(db_column='totaltime', default=0)
+    level_time = models.IntegerField(db_column='leveltime', default=0)
+    logout_time = models.IntegerField(default=0)
+    is_logout_resting = models.IntegerField(default=0)
+    rest_bonus = models.FloatField(default=0)
+    reset_talents_cost = models.IntegerField(db_column='resettalents_cost', default=0)
+    reset_talents_time = models.IntegerField(db_column='resettalents_time', default=0)
+    trans_x = models.FloatField(default=0)
+    trans_y = models.FloatField(default=0)
+    trans_z = models.FloatField(default=0)
+    trans_o = models.FloatField(default=0)
+    trans_guid = models.IntegerField(db_column='transguid', default=0)
+    extra_flags = models.IntegerField(default=0)
+    stable_slots = models.IntegerField(default=0)
+    at_login = models.IntegerField(default=0)
+    zone = models.IntegerField(default=0)
+    death_expire_time = models.IntegerField(default=0)
+    taxi_path = models.TextField(default='')
+    total_arena_points = models.IntegerField(db_column='arenaPoints', default=0)
+    weekly_arena_points = models.IntegerField(db_column='weeklyArenaPoints', default=0)
+    total_honor_points = models.IntegerField(db_column='totalHonorPoints', default=0)
+    today_honor_points = models.IntegerField(db_column='todayHonorPoints', default=0)
+    yesterday_honor_points = models.IntegerField(db_column='yesterdayHonorPoints', default=0)
+    total_kills = models.IntegerField(db_column='totalKills', default=0)
+    today_kills = models.IntegerField(db_column='todayKills', default=0)
+    yesterday_kills = models.IntegerField(db_column='yesterdayKills', default=0)
+    chosen_title = models.IntegerField(db_column='chosenTitle', default=0)
+    known_currencies = models.BigIntegerField(db_column='knownCurrencies', default=0)
+    watched_faction = models.BigIntegerField(db_column='watchedFaction', default=0)
+    drunk = models.IntegerField(default=0)
+    health = models.IntegerField(default=0)
+    power1 = models.IntegerField(default=0)
+    power2 = models.IntegerField(default=0)
+    power3 = models.IntegerField(default=0)
+    power4 = models.IntegerField(default=0)
+    power5 = models.IntegerField(default=0)
+    power6 = models.IntegerField(default=0)
+    power7 = models.IntegerField(default=0)
+    latency = models.IntegerField(default=0)
+    speccount = models.IntegerField(default=0)
+    activespec = models.IntegerField(default=0)
+    explored_zones = models.TextField(db_column='exploredZones', default='')
+    equipment_cache = models.TextField(db_column='equipmentCache', default='')
+    ammo_id = models.IntegerField(db_column='ammoId', default=0)
+    known_titles = models.TextField(db_column='knownTitles', default='')
+    action_bars = models.IntegerField(db_column='actionBars', default=0)
+    grantable_levels = models.IntegerField(db_column='grantableLevels', default=0)
+    delete_infos_account = models.IntegerField(null=True, blank=True, db_column='deleteInfos_Account')
+    delete_infos_name = models.CharField(max_length=12, null=True, blank=True, db_column='deleteInfos_Name')
+    delete_date = models.IntegerField(null=True, blank=True, db_column='deleteDate')
+
+    class Meta:
+        managed = False
+        db_table = 'characters'
+
+
+class ItemInstance(models.Model):
+    guid = models.IntegerField(primary_key=True)
+    item_entry = models.IntegerField(db_column='itemEntry')
+    owner = models.ForeignKey(Character, db_column='owner_guid')
+    creator_guid = models.IntegerField(db_column='creatorGuid')
+    gift_creator_guid = models.IntegerField(db_column='giftCreatorGuid')
+    count = models.IntegerField()
+    duration = models.IntegerField()
+    charges = models.TextField(null=True, blank=True)
+    flags = models.IntegerField()
+    enchantments = models.TextField()
+    random_property_id = models.IntegerField(db_column='randomPropertyId')
+    durability = models.IntegerField()
+    played_time = models.IntegerField(db_column='playedTime')
+    text = models.TextField(null=True, blank=True)
+
+    def get_enchantment_ids(self):
+        """The enchant ids of the enchantments field.
+
+        The field holds 3 numbers per enchantment slot, the enchant id and
+        two that are always 0.  The slots are, in order: perm_enchant,
+        temp_enchant, gem_1, gem_2, gem_3, bonus_socket and then the
+        prismatic socket and random property slots.
+        """
+        return [int(enchant) for enchant in self.enchantments.split()[::3]]
+
+    class Meta:
+        managed = False
+        db_table = 'item_instance'
+
+
+class CharacterInventory(models.Model):
+    # The bag of the slots a character has equipped, slots 0 through 18.
+    EQUIPMENT_BAG = 0
+    EQUIPMENT_SLOTS = 19
+
+    item = models.OneToOneField(ItemInstance, primary_key=True, db_column='item')
+    character = models.ForeignKey(Character, db_column='guid')
+    bag = models.IntegerField()
+    slot = models.IntegerField()
+
+    class Meta:
+        managed = False
+        db_table = 'character_inventory'
@@ -0,0 +1,146 @@
+"""Ranking items by a weighted sum of their stats.
+
+A gear planner asks for the best items of each slot for a set of stat
+weights, such as 1.0 per point of spell power and 0.8 per point of haste
+rating.  Most items only have a few of the stats in item_constants, so the
+stats are kept as sparse postings: for each slot and stat type, an array of
+the positions of the items that have it and an array of the values they
+have.
+
+Scoring a slot only walks the postings of its weighted stats and adds up the
+score of the items found there, so the cost is the number of items having
+those stats rather than every item times every stat.  The best items of the
+slot are then picked from the scored ones with heapq.
+"""
+from array import array
+import heapq
+
+from .dbc.tables import smallest_int_typecode
+from .indexes import rank_rows, RankedItems, SnapshotIndex
+from .models import ITEM_TEMPLATE_PROFILES, ItemTemplate
+
+STAT_INDEX_VERSION = 3
+
+# Inventory types that go in the slot of another one.  A robe is worn in the
+# chest slot.
+_inv_type_slots = {20: 5}
+
+
+def get_slot(inv_type_id):
+    """The inventory type of the slot an item of inv_type_id is worn in."""
+    return _inv_type_slots.get(inv_type_id, inv_type_id)
+
+
+def iter_stats(row):
+    """The (stat type, value) pairs of a dict of item template columns.
+
+    All ten stat slots are read, as stats_count does not always count the
+    slots in use.  A slot with a stat type or value of 0 is skipped.
+    """
+    for i in range(1, 11):
+        stat_type, value = row['stat_type%i' % i], row['stat_value%i' % i]
+        if stat_type and value:
+            yield stat_type, value
+
+
+class ItemStatIndex(object):
+    """Sparse postings of the stats of every equippable item.
+
+    Args:
+        rows: Tuples of the columns of the 'stats' ITEM_TEMPLATE_PROFILES
+            entry, one per item.
+
+    """
+    def __init__(self, rows):
+        columns = ITEM_TEMPLATE_PROFILES['stats']
+        rows = [dict(zip(columns, row)) for row in rows]
+        rows = rank_rows(row for row in rows if row['inv_type_id'])
+        self.items = RankedItems(rows)
+        self.slots = array('b', [get_slot(row['inv_type_id']) for row in rows])
+
+        postings = {}
+        for position, row in enumerate(rows):
+            slot = postings.setdefault(self.slots[position], {})
+            for stat_type, value in iter_stats(row):
+                positions, values = slot.setdefault(stat_type, ([], []))
+                positions.append(position)
+                values.append(value)
+
+        # postings[slot][stat type] is a pair of arrays, the positions of the
+        # items of the slot with the stat and the values they have.
+        typecode = smallest_int_typecode([len(rows)])
+        self.postings = dict(
+            (slot, dict(
+                (stat_type, (array(typecode, positions), array(smallest_int_typecode(values), values)))
+                for stat_type, (positions, values) in stats.items()
+            ))
+            for slot, stats in postings.items()
+        )
+
+    @classmethod
+    def from_database(cls):
+        """Builds the stat postings of every equippable item template."""
+        return cls(ItemTemplate.objects.profile_values_list('stats'))
+
+    def __len__(self):
+        return len(self.items)
+
+    def score(self, weights, slot):
+        """The score of every item of slot having a weighted stat.
+
+        Args:
+            weights: A dict of stat type to the weight of a point of it.
+            slot: The inventory type of the slot.
+
+        Return:
+            A dict of item position to score.
+
+        """
+        stats = self.postings.get(slot, {})
+        scores = {}
+        get = scores.get
+        for stat_type, weight in weights.items():
+            if not weight or stat_type not in stats:
+                continue
+            positions, values = stats[stat_type]
+            for position, value in zip(positions, values):
+                scores[position] = get(position, 0) + weight * value
+        return scores
+
+    def best(self, weights, limit=5, slots=None):
+        """The best scoring items of each slot.
+
+        Items with the same score are ranked by quality and item level.
+
+        Args:
+            weights: A dict of stat type to the weight of a point of it.
+            limit: The number of items of each slot.
+            slots: The inventory types of the slots to rank, defaults to
+                every slot an item with a weighted stat goes in.
+
+        Return:
+            A dict of slot inventory type to a list of dicts with the id,
+            name, quality, item_level, required_level and score of an item,
+            best first.
+
+        """
+        if slots is None:
+            slots = self.postings
+        best = {}
+        for slot in set(get_slot(slot) for slot in slots):
+            scores = self.score(weights, slot)
+            if not scores:
+                continue
+            top = heapq.nsmallest(limit, scores, key=lambda position: (-scores[position], position))
+            best[slot] = [
+                dict(self.items.get(position), score=round(scores[position], 2)) for position in top
+            ]
+        return best
+
+
+stat_index = SnapshotIndex(ItemStatIndex, 'ItemStatIndex', STAT_INDEX_VERSION)
+
+
+def best_items(weights, limit=5, slots=None):
+    """See ItemStatIndex.best."""
+    return stat_index.get().best(weights, limit, slots)
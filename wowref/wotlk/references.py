@@ -0,0 +1,69 @@
+"""Reverse indexes from spells and enchants to the items using them.
+
+The item templates point at spells through spell_id_1 to spell_id_5 and at
+the enchant of a gem through gem_properties and the GemProperties DBC.
+These indexes answer the other direction, such as which items carry a
+spell, without a query.  The pieces of an item set are listed by the
+ItemSet DBC.
+"""
+from .dbc import GemProperties
+from .dbc.tables import IntMultiTable
+from .indexes import SnapshotIndex
+from .models import ITEM_TEMPLATE_PROFILES, ItemTemplate
+
+REFERENCE_INDEX_VERSION = 2
+
+
+class ItemReferenceIndex(object):
+    """The items referencing each spell and gem properties.
+
+    Args:
+        rows: Tuples of the columns of the 'references' ITEM_TEMPLATE_PROFILES
+            entry, one per item.
+
+    """
+    def __init__(self, rows):
+        columns = ITEM_TEMPLATE_PROFILES['references']
+        # Sorted by entry, which is the first column.
+        rows = [dict(zip(columns, row)) for row in sorted(rows)]
+        self.spell_items = IntMultiTable(
+            (row['spell_id_%i' % i], row['entry'])
+            for row in rows for i in range(1, 6) if row['spell_id_%i' % i] > 0
+        )
+        self.gem_properties_items = IntMultiTable(
+            (row['gem_properties'], row['entry']) for row in rows if row['gem_properties']
+        )
+        self.size = len(rows)
+
+    @classmethod
+    def from_database(cls):
+        """Reverses the references of every item template."""
+        return cls(ItemTemplate.objects.profile_values_list('references'))
+
+    def __len__(self):
+        return self.size
+
+    def get_spell_items(self, spell_id):
+        """The entries of the items with the spell spell_id, in order."""
+        return self.spell_items.get(spell_id)
+
+    def get_enchant_gems(self, enchant_id):
+        """The entries of the gems granting the enchant enchant_id, in order."""
+        return tuple(sorted(
+            entry
+            for gem_properties_id in GemProperties.get_gem_properties_ids(enchant_id)
+            for entry in self.gem_properties_items.get(gem_properties_id)
+        ))
+
+
+reference_index = SnapshotIndex(ItemReferenceIndex, 'ItemReferenceIndex', REFERENCE_INDEX_VERSION)
+
+
+def get_spell_items(spell_id):
+    """See ItemReferenceIndex.get_spell_items."""
+    return reference_index.get().get_spell_items(spell_id)
+
+
+def get_enchant_gems(enchant_id):
+    """See ItemReferenceIndex.get_enchant_gems."""
+    return reference_index.get().get_enchant_gems(enchant_id)
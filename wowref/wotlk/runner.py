@@ -1,7 +1,5 @@
 from django.test.runner import DiscoverRunner
 
-from wotlk.dbc import load_dbc_data
-
 
 class ManagedModelRunner(DiscoverRunner):
     """
@@ -10,8 +8,6 @@ class ManagedModelRunner(DiscoverRunner):
     to execute the SQL manually to create them.
     """
 
-    load_dbc_data()
-
     def setup_test_environment(self, *args, **kwargs):
         from django.db.models.loading import get_models
         self.unmanaged_models = [m for m in get_models()
@@ -0,0 +1,135 @@
+"""Searching items by name from an in memory inverted index.
+
+Every item name is split into lower case words, and each word maps to the
+items whose name holds it.  The items are numbered by their rank, best
+quality first and then highest item level, and the postings are sorted by
+rank.  Merging the postings of a query therefore yields its matches best
+first, and a search stops as soon as it has enough of them.
+
+Each word of a query matches the words of a name it is a prefix of, so
+"glad sil" finds "Gladiator's Silk Cowl".  The words are kept sorted, so the
+words with a prefix are a single range found with a binary search.
+"""
+from array import array
+from bisect import bisect_left
+import heapq
+import re
+
+from .dbc.tables import smallest_int_typecode
+from .indexes import rank_rows, RankedItems, SnapshotIndex
+from .models import ITEM_TEMPLATE_PROFILES, ItemTemplate
+
+NAME_INDEX_VERSION = 2
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """The lower case words of text.  Apostrophes do not split a word."""
+    return _word_re.findall(text.lower().replace("'", ''))
+
+
+class ItemNameIndex(object):
+    """An inverted index of item names.
+
+    Args:
+        rows: Tuples of the columns of the 'name_index' ITEM_TEMPLATE_PROFILES
+            entry, one per item.
+
+    """
+    def __init__(self, rows):
+        columns = ITEM_TEMPLATE_PROFILES['name_index']
+        self.items = RankedItems(rank_rows(dict(zip(columns, row)) for row in rows))
+
+        # The words of each name after a space, a query word is a prefix of
+        # one of them when ' ' + word is in it.
+        self.spaced_words = []
+        postings = {}
+        for rank, name in enumerate(self.items.names):
+            words = tokenize(name)
+            self.spaced_words.append(''.join(' ' + word for word in words))
+            for word in set(words):
+                postings.setdefault(word, []).append(rank)
+
+        typecode = smallest_int_typecode([len(self.items)])
+        self.words = sorted(postings)
+        self.postings = [array(typecode, postings[word]) for word in self.words]
+
+    @classmethod
+    def from_database(cls):
+        """Indexes the name of every item template."""
+        return cls(ItemTemplate.objects.profile_values_list('name_index'))
+
+    def __len__(self):
+        return len(self.items)
+
+    def _word_range(self, prefix):
+        """The indexes in self.words of the words starting with prefix."""
+        start = bisect_left(self.words, prefix)
+        end = bisect_left(self.words, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+        return start, end
+
+    def _ranks(self, query):
+        """The ranks of the items matching query, best first."""
+        prefixes = tokenize(query)
+        if not prefixes:
+            return
+
+        # Merge the postings of the word with the fewest of them, the names
+        # found there are checked against the other words.
+        ranges = [self._word_range(prefix) for prefix in prefixes]
+        sizes = [sum(len(self.postings[i]) for i in range(*word_range)) for word_range in ranges]
+        driver = sizes.index(min(sizes))
+        if not sizes[driver]:
+            return
+        others = [' ' + prefix for prefix in prefixes[:driver] + prefixes[driver + 1:]]
+
+        previous = None
+        for rank in heapq.merge(*self.postings[slice(*ranges[driver])]):
+            # A name with several words of the prefix is in several postings.
+            if rank == previous:
+                continue
+            previous = rank
+            if others:
+                spaced_words = self.spaced_words[rank]
+                if not all(prefix in spaced_words for prefix in others):
+                    continue
+            yield rank
+
+    def search(self, query, limit=20):
+        """The items whose name matches every word of query.
+
+        Return:
+            A list of at most limit dicts, best quality and item level
+            first, with the id, name, quality, item_level and
+            required_level of an item.
+
+        """
+        results = []
+        for rank in self._ranks(query):
+            if len(results) >= limit:
+                break
+            results.append(self.items.get(rank))
+        return results
+
+    def autocomplete(self, query, limit=10):
+        """The names of the best items matching query, as (id, name) pairs."""
+        results = []
+        for rank in self._ranks(query):
+            if len(results) >= limit:
+                break
+            results.append((self.items.entries[rank], self.items.names[rank]))
+        return results
+
+
+name_index = SnapshotIndex(ItemNameIndex, 'ItemNameIndex', NAME_INDEX_VERSION)
+
+
+def search_items(query, limit=20):
+    """See ItemNameIndex.search."""
+    return name_index.get().search(query, limit)
+
+
+def autocomplete_items(query, limit=10):
+    """See ItemNameIndex.autocomplete."""
+    return name_index.get().autocomplete(query, limit)
@@ -0,0 +1,71 @@
+from django.test import TestCase
+
+from ..cache import ItemTemplateCache, LRUCache
+from ..models import ItemTemplate
+
+
+class LRUCacheTests(TestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = LRUCache(2, ttl=10, clock=lambda: self.now)
+
+    def test_hits_and_misses(self):
+        self.cache.set('a', 1)
+        self.assertEqual(1, self.cache.get('a'))
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual({'size': 1, 'max_size': 2, 'hits': 1, 'misses': 1, 'evictions': 0},
+                         self.cache.stats())
+
+    def test_evicts_least_recently_used(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(1, self.cache.get('a'))
+        self.assertEqual(1, self.cache.stats()['evictions'])
+
+    def test_expires(self):
+        self.cache.set('a', 1)
+        self.now = 10
+        self.assertIsNone(self.cache.get('a'))
+        self.assertEqual(0, len(self.cache))
+
+    def test_invalidate(self):
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.invalidate(['a'])
+        self.assertEqual(['b'], [key for key in ('a', 'b') if self.cache.get(key)])
+        self.cache.invalidate()
+        self.assertEqual(0, len(self.cache))
+
+    def test_disabled(self):
+        cache = LRUCache(0)
+        cache.set('a', 1)
+        self.assertIsNone(cache.get('a'))
+
+
+class ItemTemplateCacheTests(TestCase):
+    fixtures = ['item_hateful_mage_head.json', 'gem_delicate_scarlet_ruby.json']
+
+    def setUp(self):
+        self.cache = ItemTemplateCache(10)
+
+    def test_reads_through(self):
+        with self.assertNumQueries(1):
+            templates = self.cache.get_many(['41944', 39997, 1])
+            self.cache.get_template(41944)
+        self.assertEqual([39997, 41944], sorted(templates))
+        self.assertRaises(ItemTemplate.DoesNotExist, self.cache.get_template, 1)
+
+    def test_profiles_are_cached_separately(self):
+        self.cache.get_template(41944, 'gem')
+        with self.assertNumQueries(1):
+            self.cache.get_template(41944)
+
+    def test_invalidate_entries(self):
+        self.cache.get_template(41944)
+        self.cache.get_template(41944, 'gem')
+        self.cache.get_template(39997)
+        self.cache.invalidate_entries([41944])
+        self.assertEqual(1, len(self.cache))
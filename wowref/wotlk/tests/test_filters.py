@@ -0,0 +1,80 @@
+import json
+
+from django.core.urlresolvers import reverse
+
+from ..filters import filter_index
+from ..models import ItemTemplate
+from .utils import SnapshotIndexTestCase
+
+
+class ItemFilterIndexTests(SnapshotIndexTestCase):
+    snapshot_index = filter_index
+
+    def ids(self, criteria):
+        bits = self.index.match(criteria)
+        return [self.index.items.entries[position] for position in self.index.positions(bits)]
+
+    def test_ranked_by_quality_and_item_level(self):
+        self.assertEqual([47422, 41944, 42714, 35514], self.ids({}))
+
+    def test_facets(self):
+        self.assertEqual([41944, 42714], self.ids({'class': [4]}))
+        self.assertEqual([41944, 42714], self.ids({'sub_class': [(4, 1)]}))
+        self.assertEqual([35514], self.ids({'inv_type': [17]}))
+        self.assertEqual([47422, 41944], self.ids({'stat_type': [45]}))
+        self.assertEqual([47422, 35514], self.ids({'allowable_class': [1]}))
+        self.assertEqual([], self.ids({'quality': [3]}))
+
+    def test_any_value_of_a_facet_and_every_facet(self):
+        self.assertEqual([47422, 41944, 42714], self.ids({'stat_type': [45, 35]}))
+        self.assertEqual([41944, 42714], self.ids({'stat_type': [45, 35], 'class': [4], 'quality': [4]}))
+        self.assertEqual([41944], self.ids({'stat_type': [45], 'class': [4], 'quality': [4]}))
+
+    def test_stat_slots(self):
+        # A stat with a value of 0 is left out, and a stat after stats_count
+        # is not.
+        ItemTemplate.objects.filter(entry=41944).update(stat_value5=0, stat_type6=38, stat_value6=12)
+        self.index = filter_index.rebuild()
+        self.assertEqual([42714], self.ids({'stat_type': [35]}))
+        self.assertEqual([41944], self.ids({'stat_type': [38]}))
+
+    def test_required_level(self):
+        self.assertEqual([42714, 35514], self.ids({'required_level': (None, 70)}))
+        self.assertEqual([47422, 41944], self.ids({'required_level': (75, None)}))
+        self.assertEqual([], self.ids({'required_level': (81, None)}))
+
+    def test_positions(self):
+        bits = self.index.match({})
+        self.assertEqual([1, 2], self.index.positions(bits, offset=1, limit=2))
+
+    def test_facet_counts(self):
+        counts = self.index.facet_counts({'class': [4]}, facets=('class', 'quality'))
+        self.assertEqual([{'value': 4, 'label': 'Epic', 'count': 2}], counts['quality'])
+        # The counts of a facet do not depend on the values chosen for it.
+        self.assertEqual([{'value': 2, 'label': 'Weapon', 'count': 2},
+                          {'value': 4, 'label': 'Armor', 'count': 2}],
+                         sorted(counts['class'], key=lambda value: value['value']))
+
+
+class ItemFilterViewTests(SnapshotIndexTestCase):
+    snapshot_index = filter_index
+
+    def setUp(self):
+        super(ItemFilterViewTests, self).setUp()
+        self.url = reverse('filter')
+
+    def test_filter(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'sub_class': '4.1', 'stat_type': ['45', '36'],
+                                                  'min_level': 75, 'limit': 1})
+        self.assertEqual('application/json', response['Content-Type'])
+        result = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(1, result['total'])
+        self.assertEqual([41944], [item['id'] for item in result['items']])
+        self.assertIn({'value': [4, 1], 'label': 'Cloth', 'count': 1}, result['facets']['sub_class'])
+
+    def test_invalid_values(self):
+        self.assertEqual(400, self.client.get(self.url, {'quality': 'epic'}).status_code)
+        self.assertEqual(400, self.client.get(self.url, {'max_level': 'a'}).status_code)
+        self.assertEqual(400, self.client.get(self.url, {'sub_class': '4'}).status_code)
+        self.assertEqual(400, self.client.get(self.url, {'sub_class': '4.1.2'}).status_code)
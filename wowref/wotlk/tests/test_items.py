@@ -1,6 +1,8 @@
 from django.test import TestCase
 
-from ..items import Item, Gem
+from ..cache import item_template_cache
+from ..items import get_related_item_ids, load_character_equipment, load_item, load_items, Item, Gem
+from ..models import CharacterInventory, ItemTemplate
 
 
 class ItemTests(TestCase):
@@ -13,17 +15,18 @@ class ItemTests(TestCase):
                 'item_barb_of_tarasque.json',
                 'item_ahune_scythe.json',
                 'item_relent_caster_belt.json',
-                # 'item_instance_hateful_mage_head.json',
-                # 'item_instance_relent_caster_belt.json',
+                'item_instance_hateful_mage_head.json',
+                'item_instance_relent_caster_belt.json',
                 'gem_delicate_scarlet_ruby.json',
                 'gem_runed_cardinal_ruby.json']
 
     def setUp(self):
+        item_template_cache.invalidate()
         self.item = Item(item_id=41944)  # hateful mage head
         self.barb = Item(item_id=47422)
         self.ahune = Item(item_id=35514)
-        # self.head_instance = Item.from_item_instance_id(1)
-        # self.belt_instance = Item.from_item_instance_id(2)
+        self.head_instance = Item.from_item_instance_id(1)
+        self.belt_instance = Item.from_item_instance_id(2)
         self.maxDiff = None
 
     def test_using_item_id(self):
@@ -113,6 +116,42 @@ class ItemTests(TestCase):
              'description': 'Increases spell power by 88.'},
             bonuses[3])
 
+    def test_item_set_from_batch(self):
+        items = load_items([41944, 42713, 42714, 42715, 42716, 42717])
+        with self.assertNumQueries(0):
+            item_set = items[41944].item_set
+        self.assertEqual(self.item.item_set, item_set)
+
+    def test_tooltip_profile_loads_every_column_it_needs(self):
+        items = load_items([41944, 42713, 42714, 42715, 42716, 42717, 47422, 35514])
+        with self.assertNumQueries(0):
+            for item in (items[41944], items[47422], items[35514]):
+                for name in ('name', 'required_level', 'item_level', 'quality', 'bonding',
+                             'inv_type_name', 'class_name', 'sub_class_name', 'armor', 'dps',
+                             'primary_stats', 'secondary_stats', 'required_classes',
+                             'description', 'icon_urls', 'arcane_res', 'fire_res', 'frost_res',
+                             'nature_res', 'shadow_res', 'spells', 'item_set', 'socket_bonus',
+                             'sockets'):
+                    getattr(item, name)
+
+    def test_profile_only_loads_its_columns(self):
+        template = ItemTemplate.objects.profile('set_listing').get(pk=41944)
+        self.assertNotIn('quality', template.__dict__)
+        self.assertEqual([(41944, "Hateful Gladiator's Silk Cowl")],
+                         list(ItemTemplate.objects.profile_values_list('set_listing').filter(pk=41944)))
+
+    def test_load_item(self):
+        with self.assertNumQueries(1):
+            item = load_item('42714')
+        self.assertEqual("Gladiator's Silk Cowl", item.name)
+        self.assertRaises(ItemTemplate.DoesNotExist, load_item, 1)
+
+    def test_related_item_ids(self):
+        self.assertEqual({42713, 42714, 42715, 42716, 42717, 39997},
+                         get_related_item_ids(42714, enchant_ids=[0, 3447]))
+        self.assertEqual({42714}, get_related_item_ids(42714, item_set_id=0))
+        self.assertEqual({42713, 42714, 42715, 42716, 42717}, get_related_item_ids(42714, item_set_id=779))
+
     def test_icon_urls(self):
         expected = {
             'small': 'http://cdn.openwow.com/images/icons/small/inv_helmet_139.jpg',
@@ -144,46 +183,53 @@ class ItemTests(TestCase):
 
         self.assertIsNone(self.item.spells)
 
+    def test_to_dict(self):
+        tooltip = self.barb.to_dict()
+        self.assertEqual(47422, tooltip['id'])
+        self.assertEqual(self.barb.name, tooltip['name'])
+        self.assertEqual(125.0, tooltip['dps'])
+        self.assertEqual(set(Item.tooltip_fields) | {'id'}, set(tooltip))
+
     def test_has_flag(self):
         self.assertEqual(True, self.barb.has_flag(4))  # Heroic
 
-    # def test_enchantments(self):
-    #     enchantments = self.head_instance.enchantments
-    #     self.assertEqual(len(enchantments), 12)
+    def test_enchantments(self):
+        enchantments = self.head_instance.enchantments
+        self.assertEqual(len(enchantments), 12)
 
-    #     # Has enchant and gem in slot 2
-    #     expected = [
-    #         3002, 0, 0, 3447, 0, 0, 0, 0, 0, 0, 0, 0
-    #     ]
-    #     self.assertEqual(expected, enchantments)
+        # Has enchant and gem in slot 2
+        expected = [
+            3002, 0, 0, 3447, 0, 0, 0, 0, 0, 0, 0, 0
+        ]
+        self.assertEqual(expected, enchantments)
 
-    # def test_enchant(self):
-    #     expected = "+22 Spell Power and +14 Hit Rating"
-    #     self.assertEqual(expected, self.head_instance.enchant)
-    #     self.assertIsNone(self.item.enchant)
+    def test_enchant(self):
+        expected = "+22 Spell Power and +14 Hit Rating"
+        self.assertEqual(expected, self.head_instance.enchant)
+        self.assertIsNone(self.item.enchant)
 
     def test_gems_should_be_none_if_item_is_not_item_instance(self):
         self.assertEqual([None, None, None], self.item.gems)
 
-    # def test_gems_should_have_three_members(self):
-    #     gems = self.head_instance.gems
-    #     self.assertEqual(3, len(gems))
-
-    # def test_gems_with_no_blacksmith_socket_gem(self):
-    #     # Delicate scarlet ruby
-    #     gem = Gem(3447)
-    #     gems = self.head_instance.gems
-    #     self.assertIsNone(gems[0])
-    #     self.assertIsNone(gems[2])
-    #     self.assertEqual(gem.name, gems[1].name)
-
-    # def test_gems_with_blacksmith_socket_gem(self):
-    #     # Runed cardinal ruby.
-    #     gem = Gem(3520)
-    #     gems = self.belt_instance.gems
-    #     self.assertIsNone(gems[0])
-    #     self.assertIsNone(gems[2])
-    #     self.assertEqual(gem.name, gems[1].name)
+    def test_gems_should_have_three_members(self):
+        gems = self.head_instance.gems
+        self.assertEqual(3, len(gems))
+
+    def test_gems_with_no_blacksmith_socket_gem(self):
+        # Delicate scarlet ruby
+        gem = Gem(3447)
+        gems = self.head_instance.gems
+        self.assertIsNone(gems[0])
+        self.assertIsNone(gems[2])
+        self.assertEqual(gem.name, gems[1].name)
+
+    def test_gems_with_blacksmith_socket_gem(self):
+        # Runed cardinal ruby.
+        gem = Gem(3520)
+        gems = self.belt_instance.gems
+        self.assertIsNone(gems[0])
+        self.assertIsNone(gems[2])
+        self.assertEqual(gem.name, gems[1].name)
 
     def test_sockets_should_have_three_members(self):
         self.assertEqual(3, len(self.item.sockets))
@@ -196,44 +242,62 @@ class ItemTests(TestCase):
         ]
         self.assertEqual(expected, self.item.sockets)
 
-    # def test_sockets_with_gems_using_regular_sockets(self):
-        # head = self.head_instance
-        # expected = [
-        #     {'color_id': 1, 'name': 'Meta Socket', 'gem': None},
-        #     {
-        #         'color_id': 2, 'name': 'Red Socket', 'gem': {
-        #             'description': "+16 Agility",
-        #             'match': True,
-        #             'icon_urls': {
-        #                 'small': 'http://cdn.openwow.com/images/icons/small/inv_jewelcrafting_gem_28.jpg',
-        #                 'medium': 'http://cdn.openwow.com/images/icons/medium/inv_jewelcrafting_gem_28.jpg',
-        #                 'large': 'http://cdn.openwow.com/images/icons/large/inv_jewelcrafting_gem_28.jpg',
-        #             }
-        #         }
-        #     },
-        #     None
-        # ]
-
-        # self.assertEqual(expected, head.sockets)
-
-    # def test_sockets_with_gems_using_blacksmith_socket(self):
-    #     belt = self.belt_instance
-    #     expected = [
-    #         {'color_id': 8, 'name': 'Blue Socket', 'gem': None},
-    #         {
-    #             'color_id': 14, 'name': 'Prismatic Socket', 'gem': {
-    #                 'description': '+23 Spell Power',
-    #                 'match': True,
-    #                 'icon_urls': {
-    #                     'small': 'http://cdn.openwow.com/images/icons/small/inv_jewelcrafting_gem_37.jpg',
-    #                     'medium': 'http://cdn.openwow.com/images/icons/medium/inv_jewelcrafting_gem_37.jpg',
-    #                     'large': 'http://cdn.openwow.com/images/icons/large/inv_jewelcrafting_gem_37.jpg',
-    #                 }
-    #             }
-    #         },
-    #         None
-    #     ]
-    #     self.assertEqual(expected, belt.sockets)
+    def test_sockets_with_gems_using_regular_sockets(self):
+        head = self.head_instance
+        expected = [
+            {'color_id': 1, 'name': 'Meta Socket', 'gem': None},
+            {
+                'color_id': 2, 'name': 'Red Socket', 'gem': {
+                    'description': "+16 Agility",
+                    'match': True,
+                    'icon_urls': {
+                        'small': 'http://cdn.openwow.com/images/icons/small/inv_jewelcrafting_gem_28.jpg',
+                        'medium': 'http://cdn.openwow.com/images/icons/medium/inv_jewelcrafting_gem_28.jpg',
+                        'large': 'http://cdn.openwow.com/images/icons/large/inv_jewelcrafting_gem_28.jpg',
+                    }
+                }
+            },
+            None
+        ]
+
+        self.assertEqual(expected, head.sockets)
+
+    def test_sockets_with_gems_using_blacksmith_socket(self):
+        belt = self.belt_instance
+        expected = [
+            {'color_id': 8, 'name': 'Blue Socket', 'gem': None},
+            {
+                'color_id': 14, 'name': 'Prismatic Socket', 'gem': {
+                    'description': '+23 Spell Power',
+                    'match': True,
+                    'icon_urls': {
+                        'small': 'http://cdn.openwow.com/images/icons/small/inv_jewelcrafting_gem_37.jpg',
+                        'medium': 'http://cdn.openwow.com/images/icons/medium/inv_jewelcrafting_gem_37.jpg',
+                        'large': 'http://cdn.openwow.com/images/icons/large/inv_jewelcrafting_gem_37.jpg',
+                    }
+                }
+            },
+            None
+        ]
+        self.assertEqual(expected, belt.sockets)
+
+    def test_load_character_equipment(self):
+        CharacterInventory.objects.create(item_id=1, character_id=8899, bag=0, slot=0)
+        CharacterInventory.objects.create(item_id=2, character_id=8899, bag=0, slot=5)
+        item_template_cache.invalidate()
+
+        # The inventory with the item instances and the templates of every
+        # item and gem.
+        with self.assertNumQueries(2):
+            equipment = load_character_equipment(8899)
+            gems = [equipment[0].gems, equipment[5].gems]
+
+        self.assertEqual([0, 5], sorted(equipment))
+        self.assertEqual("Hateful Gladiator's Silk Cowl", equipment[0].name)
+        self.assertEqual("+22 Spell Power and +14 Hit Rating", equipment[0].enchant)
+        self.assertEqual(Gem(3447).name, gems[0][1].name)
+        self.assertEqual(Gem(3520).name, gems[1][1].name)
+        self.assertEqual({}, load_character_equipment(8900))
 
     def test_socket_bonus(self):
         expected = {'description': '+8 Resilience Rating', 'active': False}
@@ -244,6 +308,7 @@ class GemTests(TestCase):
     fixtures = ['gem_delicate_scarlet_ruby.json']
 
     def setUp(self):
+        item_template_cache.invalidate()
         self.scarlet_ruby = Gem(3447)
 
     def test_item_id(self):
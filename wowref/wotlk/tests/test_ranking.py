@@ -0,0 +1,65 @@
+import json
+
+from django.core.urlresolvers import reverse
+
+from ..models import ItemTemplate
+from ..ranking import get_slot, stat_index
+from .utils import SnapshotIndexTestCase
+
+
+class ItemStatIndexTests(SnapshotIndexTestCase):
+    snapshot_index = stat_index
+
+    def ids(self, best):
+        return dict((slot, [item['id'] for item in items]) for slot, items in best.items())
+
+    def test_get_slot(self):
+        self.assertEqual(5, get_slot(20))  # Robe
+        self.assertEqual(1, get_slot(1))
+
+    def test_score(self):
+        scores = self.index.score({5: 1.0, 32: 0.5}, 1)
+        self.assertEqual([67.0, 24.0], sorted(scores.values(), reverse=True))
+
+    def test_best(self):
+        best = self.index.best({5: 1.0, 32: 0.5}, limit=1)
+        self.assertEqual({1: [41944], 21: [47422], 17: [35514]}, self.ids(best))
+        self.assertEqual(51.5, best[17][0]['score'])
+
+    def test_best_only_has_items_with_weighted_stats(self):
+        self.assertEqual({1: [41944], 21: [47422]}, self.ids(self.index.best({45: 1.0})))
+        self.assertEqual({}, self.index.best({45: 0}))
+
+    def test_stat_slots(self):
+        ItemTemplate.objects.filter(entry=41944).update(stat_value5=0, stat_type6=38, stat_value6=12)
+        self.index = stat_index.rebuild()
+        self.assertEqual({1: [42714]}, self.ids(self.index.best({35: 1.0})))
+        self.assertEqual({1: [41944]}, self.ids(self.index.best({38: 1.0})))
+
+    def test_best_of_slots(self):
+        best = self.index.best({5: 1.0, 32: 0.5}, slots=[1])
+        self.assertEqual({1: [41944, 42714]}, self.ids(best))
+
+
+class BestItemsViewTests(SnapshotIndexTestCase):
+    snapshot_index = stat_index
+
+    def setUp(self):
+        super(BestItemsViewTests, self).setUp()
+        self.url = reverse('best')
+
+    def test_best(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(self.url, {'weights': '5:1,32:0.5', 'slot': 1, 'limit': 1})
+        self.assertEqual('application/json', response['Content-Type'])
+        result = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(['1'], list(result['slots']))
+        self.assertEqual('Head', result['slots']['1']['name'])
+        self.assertEqual([41944], [item['id'] for item in result['slots']['1']['items']])
+
+    def test_invalid_weights(self):
+        self.assertEqual(400, self.client.get(self.url, {'weights': 'a:1'}).status_code)
+        self.assertEqual(400, self.client.get(self.url, {'weights': '45'}).status_code)
+        self.assertEqual(400, self.client.get(self.url, {'weights': '2:1'}).status_code)
+        self.assertEqual(400, self.client.get(self.url, {'weights': '5:nan'}).status_code)
+        self.assertEqual(400, self.client.get(self.url, {'weights': '5:-inf'}).status_code)
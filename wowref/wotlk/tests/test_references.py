@@ -0,0 +1,19 @@
+from ..references import get_enchant_gems, get_spell_items, reference_index
+from .utils import SnapshotIndexTestCase
+
+
+class ItemReferenceIndexTests(SnapshotIndexTestCase):
+    fixtures = SnapshotIndexTestCase.fixtures + ['gem_delicate_scarlet_ruby.json',
+                                                 'gem_runed_cardinal_ruby.json']
+    snapshot_index = reference_index
+
+    def test_spell_items(self):
+        with self.assertNumQueries(0):
+            self.assertEqual((42714,), get_spell_items(18054))
+        self.assertEqual((35514,), get_spell_items(21638))
+        self.assertEqual((), get_spell_items(1))
+
+    def test_enchant_gems(self):
+        self.assertEqual((39997,), get_enchant_gems(3447))
+        self.assertEqual((40113,), get_enchant_gems(3520))
+        self.assertEqual((), get_enchant_gems(3002))
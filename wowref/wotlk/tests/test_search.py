@@ -0,0 +1,79 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from ..dbc.snapshots import read_snapshot
+from ..search import name_index, tokenize, ItemNameIndex
+from .utils import SnapshotIndexTestCase
+
+
+class ItemNameIndexTests(TestCase):
+    def setUp(self):
+        self.index = ItemNameIndex([
+            (41944, "Hateful Gladiator's Silk Cowl", 4, 200, 80),
+            (42714, "Gladiator's Silk Cowl", 4, 213, 80),
+            (4306, 'Silk Cloth', 1, 26, 0),
+            (4305, 'Bolt of Silk Cloth', 1, 35, 0),
+        ])
+
+    def test_tokenize(self):
+        self.assertEqual(['hateful', 'gladiators', 'silk', 'cowl'],
+                         tokenize("Hateful Gladiator's Silk Cowl"))
+
+    def test_ranked_by_quality_and_item_level(self):
+        self.assertEqual([42714, 41944, 4305, 4306],
+                         [result['id'] for result in self.index.search('silk')])
+
+    def test_prefixes(self):
+        self.assertEqual([42714, 41944], [result['id'] for result in self.index.search('glad sil')])
+        self.assertEqual([41944], [result['id'] for result in self.index.search("hate Gladiator's")])
+        self.assertEqual([], self.index.search('silk robe'))
+        self.assertEqual([], self.index.search(''))
+
+    def test_limit(self):
+        self.assertEqual([42714], [result['id'] for result in self.index.search('silk', limit=1)])
+
+    def test_search_result(self):
+        expected = {'id': 4306, 'name': 'Silk Cloth', 'quality': 1, 'item_level': 26,
+                    'required_level': 0}
+        self.assertEqual([expected], self.index.search('cloth', limit=2)[1:])
+
+    def test_autocomplete(self):
+        self.assertEqual([(4305, 'Bolt of Silk Cloth'), (4306, 'Silk Cloth')],
+                         self.index.autocomplete('silk cl'))
+        self.assertEqual([(42714, "Gladiator's Silk Cowl")], self.index.autocomplete('s', limit=1))
+
+
+class ItemSearchViewTests(SnapshotIndexTestCase):
+    snapshot_index = name_index
+
+    def test_search(self):
+        response = self.client.get(reverse('search'), {'q': 'gladiator cowl'})
+        self.assertEqual('application/json', response['Content-Type'])
+        results = json.loads(response.content.decode('utf-8'))['results']
+        self.assertEqual([41944, 42714], [result['id'] for result in results])
+
+    def test_search_limit(self):
+        response = self.client.get(reverse('search'), {'q': 'cowl', 'limit': 1})
+        self.assertEqual(1, len(json.loads(response.content.decode('utf-8'))['results']))
+        self.assertEqual(400, self.client.get(reverse('search'), {'q': 'cowl', 'limit': 'a'}).status_code)
+
+    def test_autocomplete(self):
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('autocomplete'), {'q': 'barb'})
+        expected = [{'id': 47422, 'name': 'Barb of Tarasque'}]
+        self.assertEqual(expected, json.loads(response.content.decode('utf-8'))['results'])
+
+    def test_build_name_index(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'ItemNameIndex.snapshot')
+            self.assertEqual(4, name_index.build(path))
+            index = read_snapshot(path, None, name_index.get_version())
+            self.assertEqual([47422], [result['id'] for result in index.search('tarasque')])
+        finally:
+            shutil.rmtree(directory)
@@ -0,0 +1,115 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+from django.test.utils import override_settings
+
+from ..cache import item_template_cache
+from ..models import ItemTemplate
+from ..dbc.snapshots import KeyedSnapshot
+from .. import tooltips
+from ..items import Item
+from ..tooltips import (
+    get_cached_tooltip, get_materialized_tooltip, get_materialized_tooltip_version, get_tooltip_cache,
+    get_tooltip_digest, get_tooltip_etag, materialize_tooltips, tooltip_cache_key
+)
+
+
+class TooltipCacheKeyTests(TestCase):
+    fixtures = ['item_barb_of_tarasque.json']
+
+    def setUp(self):
+        item_template_cache.invalidate()
+
+    def test_key(self):
+        self.assertEqual(tooltip_cache_key(41944, 'a', 'en-us'), tooltip_cache_key('41944', 'a', 'en-us'))
+        self.assertNotEqual(tooltip_cache_key(41944, 'a', 'en-us'), tooltip_cache_key(41944, 'a', 'de'))
+        self.assertNotEqual(tooltip_cache_key(41944, 'a', 'en-us'), tooltip_cache_key(41944, 'b', 'en-us'))
+
+    def test_digest(self):
+        digest = get_tooltip_digest(47422)
+        with override_settings(TOOLTIP_DATA_VERSION=2):
+            self.assertNotEqual(digest, get_tooltip_digest(47422))
+        self.assertIsNone(get_tooltip_digest(1))
+
+
+class ItemDetailViewCacheTests(TestCase):
+    fixtures = ['item_hateful_mage_head.json',
+                'item_glad_mage_head.json',
+                'item_glad_mage_chest.json',
+                'item_glad_mage_shoulders.json',
+                'item_glad_mage_legs.json',
+                'item_glad_mage_hands.json']
+
+    def setUp(self):
+        get_tooltip_cache().clear()
+        item_template_cache.invalidate()
+        self.url = reverse('item', kwargs={'pk': 41944})
+
+    def test_serves_cached_tooltip(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.content, get_cached_tooltip(41944))
+
+        with self.assertNumQueries(0):
+            cached = self.client.get(self.url)
+        self.assertEqual(response.content, cached.content)
+
+    def test_validators(self):
+        response = self.client.get(self.url)
+        self.assertEqual('"%s"' % get_tooltip_etag(41944), response['ETag'])
+        self.assertNotIn('Last-Modified', response)
+
+    def test_not_modified(self):
+        etag = self.client.get(self.url)['ETag']
+        item_template_cache.invalidate()
+        get_tooltip_cache().clear()
+
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(304, response.status_code)
+        self.assertIsNone(get_cached_tooltip(41944))
+
+    def test_edited_item_is_not_served_from_the_cache(self):
+        self.client.get(self.url)
+        item_template_cache.invalidate()
+        ItemTemplate.objects.filter(pk=41944).update(name='Changed')
+        self.assertIsNone(get_cached_tooltip(41944))
+
+    def test_etag_changes_with_the_item(self):
+        etag = get_tooltip_etag(41944)
+        item_template_cache.invalidate()
+        ItemTemplate.objects.filter(pk=41944).update(name='Changed')
+        self.assertNotEqual(etag, get_tooltip_etag(41944))
+
+
+class MaterializeTooltipsTests(TestCase):
+    fixtures = ['item_barb_of_tarasque.json', 'item_ahune_scythe.json']
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'ItemTooltips.snapshot')
+
+    def tearDown(self):
+        tooltips._materialized_tooltips = None
+        shutil.rmtree(self.directory)
+
+    def test_materialize(self):
+        self.assertEqual(2, materialize_tooltips(processes=1, path=self.path))
+        snapshot = KeyedSnapshot(self.path, [], get_materialized_tooltip_version())
+        self.assertEqual([35514, 47422], list(snapshot))
+
+        tooltips._materialized_tooltips = snapshot
+        self.assertEqual(json.loads(json.dumps(Item(47422).to_dict())),
+                         get_materialized_tooltip(47422, get_tooltip_digest(47422)))
+
+    def test_changed_item_is_not_served(self):
+        materialize_tooltips(processes=1, path=self.path)
+        tooltips._materialized_tooltips = KeyedSnapshot(self.path, [], get_materialized_tooltip_version())
+
+        item_template_cache.invalidate()
+        ItemTemplate.objects.filter(pk=47422).update(name='Changed')
+        self.assertIsNone(get_materialized_tooltip(47422, get_tooltip_digest(47422)))
+        self.assertIsNotNone(get_materialized_tooltip(35514, get_tooltip_digest(35514)))
@@ -0,0 +1,36 @@
+import json
+
+from django.core.urlresolvers import reverse
+from django.test import TestCase
+
+from ..cache import item_template_cache
+from ..items import Item
+
+
+class ItemBatchViewTests(TestCase):
+    fixtures = ['item_hateful_mage_head.json',
+                'item_glad_mage_head.json',
+                'item_glad_mage_chest.json',
+                'item_glad_mage_shoulders.json',
+                'item_glad_mage_legs.json',
+                'item_glad_mage_hands.json',
+                'item_barb_of_tarasque.json',
+                'item_ahune_scythe.json']
+
+    def setUp(self):
+        item_template_cache.invalidate()
+        self.url = reverse('items')
+
+    def test_items(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'ids': '47422,35514,1'})
+        self.assertEqual('application/json', response['Content-Type'])
+
+        items = json.loads(response.content.decode('utf-8'))['items']
+        self.assertEqual({'47422', '35514'}, set(items))
+        self.assertEqual(Item(47422).to_dict(), items['47422'])
+
+    def test_invalid_ids(self):
+        self.assertEqual(400, self.client.get(self.url, {'ids': '1,a'}).status_code)
+        ids = ','.join(str(i) for i in range(1000))
+        self.assertEqual(400, self.client.get(self.url, {'ids': ids}).status_code)
@@ -0,0 +1,16 @@
+from django.test import TestCase
+
+
+class SnapshotIndexTestCase(TestCase):
+    """Tests of a SnapshotIndex, rebuilt from the item fixtures before each test.
+
+    Subclasses set snapshot_index, and the rebuilt index is self.index.
+    """
+    fixtures = ['item_hateful_mage_head.json',
+                'item_glad_mage_head.json',
+                'item_barb_of_tarasque.json',
+                'item_ahune_scythe.json']
+    snapshot_index = None
+
+    def setUp(self):
+        self.index = self.snapshot_index.rebuild()
@@ -0,0 +1,224 @@
+"""Caching of rendered item tooltips.
+
+A tooltip of an item without instance data only depends on its template and
+the DBC data, so it is rendered once and kept in the 'tooltips' cache from
+the CACHES setting.  Any Django cache backend can be used there: local
+memory, a file based cache, or memcached.
+
+Every tooltip has a digest of the item template columns it is rendered
+from, the names of its set pieces and the DBC data version.  The cache keys
+include it, so a tooltip is rendered again after its row is edited, and
+every tooltip is invalidated at once when the DBC files or the loaders
+change.  TOOLTIP_DATA_VERSION can be bumped in the settings to do the same
+after the item database is updated.
+
+The ETag validator is the digest of the tooltip and its locale, computed
+from the cached item template rows without rendering anything.  There is no
+Last-Modified validator, since nothing records when an item template row
+changed.
+
+materialize_tooltips renders the tooltip of every item template offline
+into a keyed snapshot, so most tooltips are a single lookup at runtime.  The
+digest of each tooltip is stored with it.  A tooltip whose row changed since
+the snapshot was built no longer matches its digest and is rendered from the
+database instead, until materialize_tooltips runs again.
+"""
+import concurrent.futures
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import get_cache
+from django.db import connections
+from django.utils.translation import get_language
+
+from .cache import item_template_cache
+from .dbc import get_data_version, get_snapshot_path, ItemSet
+from .dbc.snapshots import write_keyed_snapshot, KeyedSnapshot, StaleSnapshot
+from .items import load_tooltip_items
+from .models import ITEM_TEMPLATE_PROFILES, ItemTemplate
+
+TOOLTIP_CACHE_ALIAS = 'tooltips'
+
+# Bump when the output of Item.to_dict changes, so the materialized
+# tooltips are no longer used.
+MATERIALIZED_TOOLTIP_VERSION = 2
+
+# The length of a hex sha1 digest, which prefixes each materialized tooltip.
+_DIGEST_LENGTH = 40
+
+_materialized_tooltips = None
+
+
+def get_tooltip_cache():
+    return get_cache(TOOLTIP_CACHE_ALIAS)
+
+
+def get_tooltip_version():
+    """The version of the data every tooltip is rendered from."""
+    return '%s.%s' % (get_data_version(), getattr(settings, 'TOOLTIP_DATA_VERSION', 1))
+
+
+def tooltip_cache_key(item_id, digest, locale=None):
+    """The cache key of the tooltip of item_id in locale.
+
+    Args:
+        item_id: The id of the item.
+        digest: The digest of the tooltip, see get_tooltip_digests.
+        locale: The language code, defaults to the active language.
+
+    """
+    return 'tooltip:%i:%s:%s' % (int(item_id), digest, locale or get_language())
+
+
+def get_cached_tooltip(item_id, locale=None):
+    """The rendered tooltip of item_id as bytes, or None if it is not cached."""
+    digest = get_tooltip_digest(item_id)
+    if digest is None:
+        return None
+    return get_tooltip_cache().get(tooltip_cache_key(item_id, digest, locale))
+
+
+def set_cached_tooltip(item_id, content, locale=None):
+    digest = get_tooltip_digest(item_id)
+    if digest is not None:
+        get_tooltip_cache().set(tooltip_cache_key(item_id, digest, locale), content)
+
+
+def get_tooltip_digests(item_ids):
+    """The digests of the tooltips of item_ids.
+
+    A digest is a hash of the tooltip columns of the item, the names of its
+    set pieces and the data version, so it changes whenever the tooltip
+    could.  The rows are read through the item template cache, in two
+    queries at most.
+
+    Return:
+        A dict of item id to hex digest, for the ids that have a template.
+
+    """
+    templates = item_template_cache.get_many(item_ids)
+    item_sets = dict((entry, ItemSet.get_item_set(template.item_set))
+                     for entry, template in templates.items())
+    pieces = item_template_cache.get_many(
+        [piece_id for item_set in item_sets.values() if item_set for piece_id in item_set['items']],
+        'set_listing'
+    )
+
+    version = get_tooltip_version()
+    digests = {}
+    for entry, template in templates.items():
+        values = [getattr(template, name) for name in ITEM_TEMPLATE_PROFILES['tooltip']]
+        if item_sets[entry]:
+            values.extend(sorted(
+                (piece_id, pieces[piece_id].name) for piece_id in item_sets[entry]['items']
+                if piece_id in pieces
+            ))
+        digests[entry] = hashlib.sha1(repr((values, version)).encode('utf-8')).hexdigest()
+    return digests
+
+
+def get_tooltip_digest(item_id):
+    """The digest of the tooltip of item_id, or None if there is no such item."""
+    try:
+        return get_tooltip_digests([item_id]).get(int(item_id))
+    except (TypeError, ValueError):
+        return None
+
+
+def get_tooltip_etag(item_id, locale=None):
+    """The ETag of the tooltip of item_id, or None if there is no such item.
+
+    It is a hash of the digest of the tooltip and the locale.
+    """
+    digest = get_tooltip_digest(item_id)
+    if digest is None:
+        return None
+    return hashlib.sha1(('%s:%s' % (digest, locale or get_language())).encode('utf-8')).hexdigest()
+
+
+def get_materialized_tooltip_path():
+    return get_snapshot_path('ItemTooltips')
+
+
+def get_materialized_tooltip_version():
+    return (get_tooltip_version(), MATERIALIZED_TOOLTIP_VERSION)
+
+
+def materialize_tooltips(processes=None, chunk_size=500, path=None):
+    """Renders the tooltip of every item template into a keyed snapshot.
+
+    Each worker process builds the Items of a chunk of entries with
+    load_tooltip_items and stores their Item.to_dict as JSON, prefixed with
+    the digest of the tooltip.
+
+    Args:
+        processes: The number of worker processes, defaults to the number of
+            CPUs.  With 1 everything is rendered in this process instead.
+        chunk_size: The number of items sent to a worker at once.
+        path: Where to write the snapshot, defaults to the one that
+            get_materialized_tooltip reads.
+
+    Returns:
+        The number of tooltips that were stored.
+
+    """
+    global _materialized_tooltips
+    entries = list(ItemTemplate.objects.order_by('entry').values_list('entry', flat=True))
+    chunks = [entries[i:i + chunk_size] for i in range(0, len(entries), chunk_size)]
+
+    if processes == 1:
+        rendered = [_materialize_chunk(chunk) for chunk in chunks]
+    else:
+        # The forked workers must not share the database connections of this
+        # process, each of them opens its own.
+        _close_connections()
+        with concurrent.futures.ProcessPoolExecutor(
+                max_workers=processes, initializer=_close_connections) as executor:
+            rendered = list(executor.map(_materialize_chunk, chunks))
+
+    items = [item for chunk in rendered for item in chunk]
+    write_keyed_snapshot(path or get_materialized_tooltip_path(), [],
+                         get_materialized_tooltip_version(), items)
+    _materialized_tooltips = None
+    return len(items)
+
+
+def _close_connections():
+    for connection in connections.all():
+        connection.close()
+
+
+def _materialize_chunk(entries):
+    """The digests and tooltips of entries, run in a worker process."""
+    digests = get_tooltip_digests(entries)
+    return [
+        (item_id, digests[item_id].encode('ascii') + json.dumps(item.to_dict()).encode('utf-8'))
+        for item_id, item in load_tooltip_items(entries).items() if item_id in digests
+    ]
+
+
+def get_materialized_tooltip(item_id, digest):
+    """The materialized Item.to_dict of item_id.
+
+    Args:
+        item_id: The id of the item.
+        digest: The current digest of its tooltip, see get_tooltip_digests.
+
+    Return:
+        The tooltip, or None if there is none or it was materialized from
+        a row that has changed since.
+
+    """
+    global _materialized_tooltips
+    if _materialized_tooltips is None:
+        try:
+            _materialized_tooltips = KeyedSnapshot(
+                get_materialized_tooltip_path(), [], get_materialized_tooltip_version())
+        except StaleSnapshot:
+            _materialized_tooltips = {}
+
+    tooltip = _materialized_tooltips.get(int(item_id))
+    if tooltip is None or digest is None or tooltip[:_DIGEST_LENGTH] != digest.encode('ascii'):
+        return None
+    return json.loads(tooltip[_DIGEST_LENGTH:].decode('utf-8'))
@@ -1,8 +1,16 @@
 from django.conf.urls import patterns, url
 
-from .views import ItemDetailView
+from .views import (
+    BestItemsView, ItemAutocompleteView, ItemBatchView, ItemDetailView, ItemFilterView,
+    ItemSearchView
+)
 
 urlpatterns = patterns(
     '',
     url(r'item/(?P<pk>\d+)/$', ItemDetailView.as_view(), name='item'),
+    url(r'items/$', ItemBatchView.as_view(), name='items'),
+    url(r'search/$', ItemSearchView.as_view(), name='search'),
+    url(r'search/autocomplete/$', ItemAutocompleteView.as_view(), name='autocomplete'),
+    url(r'filter/$', ItemFilterView.as_view(), name='filter'),
+    url(r'best/$', BestItemsView.as_view(), name='best'),
 )
@@ -1,11 +1,189 @@
-from django.views.generic import DetailView
+import json
+import math
 
-from .items import Item
+from django.http import HttpResponse, HttpResponseBadRequest
+from django.utils.decorators import method_decorator
+from django.views.decorators.http import condition
+from django.views.generic import DetailView, View
+
+from .filters import filter_items, FACETS
+from .item_constants import get_inventory_type, get_stat_name
+from .items import load_item, load_tooltip_items
+from .ranking import best_items
+from .search import autocomplete_items, search_items
+from .tooltips import (
+    get_cached_tooltip, get_materialized_tooltip, get_tooltip_digest, get_tooltip_etag, set_cached_tooltip
+)
 
 
 class ItemDetailView(DetailView):
     context_object_name = 'item'
     template_name = 'item-detail.html'
 
+    @method_decorator(condition(etag_func=lambda request, pk: get_tooltip_etag(pk)))
+    def get(self, request, *args, **kwargs):
+        """Serves the tooltip from the tooltip cache, rendering it on a miss."""
+        content = get_cached_tooltip(self.kwargs['pk'])
+        if content is not None:
+            return HttpResponse(content)
+
+        response = super(ItemDetailView, self).get(request, *args, **kwargs)
+        response.render()
+        set_cached_tooltip(self.kwargs['pk'], response.content)
+        return response
+
     def get_object(self):
-        return Item(self.kwargs['pk'])
+        """The materialized tooltip of the item, or the Item if there is none.
+
+        The template only reads the fields of Item.to_dict, so either works.
+        A materialized tooltip is only used while its digest still matches
+        the item template row.
+        """
+        tooltip = get_materialized_tooltip(self.kwargs['pk'], get_tooltip_digest(self.kwargs['pk']))
+        if tooltip is not None:
+            return tooltip
+        return load_item(self.kwargs['pk'])
+
+
+class ItemBatchView(View):
+    """The tooltips of many items as JSON.
+
+    The items are given as comma separated ids, as in items/?ids=41944,47422.
+    The response maps each id that has an item to its Item.to_dict().
+    """
+    max_items = 100
+
+    def get(self, request, *args, **kwargs):
+        try:
+            item_ids = [int(item_id) for item_id in request.GET.get('ids', '').split(',') if item_id]
+        except ValueError:
+            return HttpResponseBadRequest('ids must be a comma separated list of item ids')
+        if len(item_ids) > self.max_items:
+            return HttpResponseBadRequest('At most %i items can be requested at once' % self.max_items)
+
+        items = load_tooltip_items(item_ids)
+        content = json.dumps({
+            'items': dict((str(item_id), item.to_dict()) for item_id, item in items.items())
+        })
+        return HttpResponse(content, content_type='application/json')
+
+
+class ItemSearchView(View):
+    """Items whose name matches the q parameter as JSON, best first.
+
+    Each word of q matches the start of a word of the name, as in
+    search/?q=glad+silk.  limit is the number of results, at most
+    max_results.
+    """
+    default_limit = 20
+    max_results = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            limit = int(request.GET.get('limit', self.default_limit))
+        except ValueError:
+            return HttpResponseBadRequest('limit must be a number')
+        limit = max(0, min(limit, self.max_results))
+
+        content = json.dumps({'results': self.search(request.GET.get('q', ''), limit)})
+        return HttpResponse(content, content_type='application/json')
+
+    def search(self, query, limit):
+        return search_items(query, limit)
+
+
+class ItemAutocompleteView(ItemSearchView):
+    """The ids and names of the best items matching q, for a search box."""
+    default_limit = 10
+    max_results = 20
+
+    def search(self, query, limit):
+        return [{'id': item_id, 'name': name} for item_id, name in autocomplete_items(query, limit)]
+
+
+class ItemFilterView(View):
+    """The items matching a set of facet values as JSON, with facet counts.
+
+    Every facet parameter can be repeated, an item matches when it has any of
+    the values given for a facet and matches every facet given, as in
+    filter/?class=4&quality=3&quality=4&stat_type=45&min_level=70.
+    sub_class values are the class and sub class joined by a dot, as in 4.1.
+    """
+    default_limit = 50
+    max_results = 200
+    facets = FACETS
+
+    def get(self, request, *args, **kwargs):
+        try:
+            criteria = self.get_criteria(request.GET)
+            offset = max(0, int(request.GET.get('offset', 0)))
+            limit = max(0, min(int(request.GET.get('limit', self.default_limit)), self.max_results))
+        except ValueError:
+            return HttpResponseBadRequest('Facet values, levels, offset and limit must be numbers')
+
+        result = filter_items(criteria, offset, limit)
+        return HttpResponse(json.dumps(result), content_type='application/json')
+
+    def get_criteria(self, params):
+        criteria = {}
+        for facet in self.facets:
+            values = params.getlist(facet)
+            if not values:
+                continue
+            if facet == 'sub_class':
+                criteria[facet] = [self.get_sub_class(value) for value in values]
+            else:
+                criteria[facet] = [int(value) for value in values]
+
+        min_level, max_level = params.get('min_level'), params.get('max_level')
+        if min_level or max_level:
+            criteria['required_level'] = (int(min_level) if min_level else None,
+                                          int(max_level) if max_level else None)
+        return criteria
+
+    def get_sub_class(self, value):
+        class_id, sub_class = value.split('.')
+        return int(class_id), int(sub_class)
+
+
+class BestItemsView(View):
+    """The best items of each slot for a set of stat weights as JSON.
+
+    The weights are comma separated stat type:weight pairs, with the stat
+    types of item_constants, as in best/?weights=45:1,36:0.8&slot=1.  slot
+    can be repeated to only rank those slots, limit is the number of items
+    of each slot.
+    """
+    default_limit = 5
+    max_results = 50
+
+    def get(self, request, *args, **kwargs):
+        try:
+            weights = self.get_weights(request.GET.get('weights', ''))
+            slots = [int(slot) for slot in request.GET.getlist('slot')] or None
+            limit = max(0, min(int(request.GET.get('limit', self.default_limit)), self.max_results))
+        except ValueError:
+            return HttpResponseBadRequest(
+                'weights must be comma separated stat type:weight pairs, slot and limit numbers')
+        unknown = [str(stat_type) for stat_type in weights if get_stat_name(stat_type) is None]
+        if unknown:
+            return HttpResponseBadRequest('Unknown stat types %s' % ', '.join(unknown))
+
+        best = best_items(weights, limit, slots)
+        content = json.dumps({'slots': dict(
+            (str(slot), {'name': get_inventory_type(slot), 'items': items}) for slot, items in best.items()
+        )})
+        return HttpResponse(content, content_type='application/json')
+
+    def get_weights(self, value):
+        weights = {}
+        for pair in value.split(','):
+            if pair:
+                stat_type, weight = pair.split(':', 1)
+                weight = float(weight)
+                # float accepts nan and inf, which would score every item
+                # NaN and can not be written as JSON.
+                if math.isnan(weight) or math.isinf(weight):
+                    raise ValueError('Weights must be finite')
+                weights[int(stat_type)] = weight
+        return weights
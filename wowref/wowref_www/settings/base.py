@@ -51,6 +51,31 @@ STATICFILES_DIRS = [BASE.child('static')]
 
 ICONS_URL = 'http://cdn.openwow.com/images/icons'
 
+# The 'tooltips' cache holds rendered item tooltips, see wotlk.tooltips.  Any
+# backend works, such as FileBasedCache or MemcachedCache in production.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'tooltips': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tooltips',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# Bump to invalidate every cached tooltip after the item database changes.
+TOOLTIP_DATA_VERSION = 1
+
+# The process local cache of ItemTemplate rows, see wotlk.cache.
+ITEM_TEMPLATE_CACHE = {
+    'SIZE': 4096,
+    'TTL': 600,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
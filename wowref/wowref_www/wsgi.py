@@ -10,8 +10,8 @@ https://docs.djangoproject.com/en/1.6/howto/deployment/wsgi/
 import os
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "wowref_www.settings.production")
 
-from wotlk.dbc import load_dbc_data
-load_dbc_data()
-
+# The DBC tables load themselves the first time they are used.  A pre-fork
+# server that wants them loaded once before forking can call
+# wotlk.dbc.load_dbc_data(processes=...) from its preload hook.
 from django.core.wsgi import get_wsgi_application
 application = get_wsgi_application()